@@ -1,15 +1,22 @@
-from flask import Flask, request, send_file, jsonify
+from flask import Flask, request, send_file, jsonify, Response, stream_with_context
 from werkzeug.utils import secure_filename
 import os
 import logging
 import io
 import base64
+import json
+import shutil
+import tempfile
 from macro_parser import MacroParser
-from pdf_generator import generate_pdf
-from gemini_enhancer import enhance_explanation_with_gemini
-from db import save_document, get_all_documents, get_document_by_id, get_all_macros, get_macros_by_document_id, get_macro_by_id
+from pdf_generator import generate_pdf, generate_sections_pdf
+from doc_writer import build_sections, write_documentation, FORMATS
+from gemini_enhancer import iter_enhanced_explanations
+from db import save_document, get_all_documents, get_document_by_id, get_all_macros, get_macros_by_document_id, get_macro_by_id, get_macros_by_speedup
+from db import get_procedures_by_document_id, get_procedures_using_variable, get_callers
 from flask_cors import CORS
 from MacroQualityAnalyser import MacroQualityAnalyzer  # Ensure to import your analyzer
+from vba_translator import PythonTranslator
+from vectorization_detector import VectorizationDetector, format_report
 
 app = Flask(__name__)
 app.secret_key = 'your_secret_key'
@@ -46,66 +53,20 @@ def upload_file():
             file.save(filepath)
             logger.info(f"File saved to: {filepath}")
             
-            try:
-                # Process the file
-                parser = MacroParser()
-                parser.load_from_excel(filepath)
-                parsed_macros = parser.parse_macros()
-                logger.info(f"Parsed macros: {parsed_macros}")
-                
-                logic_explanations = parser.extract_functional_logic(parsed_macros)
-                logger.info(f"Logic explanations: {logic_explanations}")
-                
-                # Enhance explanations with Gemini
-                enhanced_explanations = []
-                for explanation in logic_explanations:
-                    logger.info(f"Processing explanation: {explanation}")
-                    enhanced = enhance_explanation_with_gemini(str(explanation))
-                    enhanced_explanations.append(enhanced)
-                
-                logger.info(f"Enhanced explanations: {enhanced_explanations}")
-                
-                functional_documentation = parser.generate_functional_documentation(enhanced_explanations)
-                
-                # Analyze macros with MacroQualityAnalyzer
-                analyzer = MacroQualityAnalyzer(filepath)
-                analysis_results = analyzer.analyze_macros()
-                
-                # Generate PDF for functional documentation
-                functional_pdf_path = generate_pdf(functional_documentation, f"{filename}_functional_documentation.pdf")
-                
-                # Generate PDF for analysis report
-                analysis_pdf_path = generate_pdf(analysis_results, f"{filename}_analysis_report.pdf")
-                
-                # Read PDF data
-                with open(functional_pdf_path, 'rb') as functional_pdf_file:
-                    functional_pdf_data = functional_pdf_file.read()
-                
-                with open(analysis_pdf_path, 'rb') as analysis_pdf_file:
-                    analysis_pdf_data = analysis_pdf_file.read()
-                
-                # Save document and macros in the database
-                document_id = save_document(filename, functional_pdf_data, analysis_pdf_data, parsed_macros, logic_explanations)
-                logger.info(f"Document saved with ID: {document_id}")
-                
-                # Clean up: remove the uploaded and generated files
-                if os.path.exists(filepath):
-                    os.remove(filepath)
-                if os.path.exists(functional_pdf_path):
-                    os.remove(functional_pdf_path)
-                if os.path.exists(analysis_pdf_path):
-                    os.remove(analysis_pdf_path)
-
-                # Return both PDF files for download
-                return jsonify({
-                    'functional_documentation_pdf': base64.b64encode(functional_pdf_data).decode('utf-8'),
-                    'analysis_report_pdf': base64.b64encode(analysis_pdf_data).decode('utf-8'),
-                    'document_id': document_id
-                })
-            
-            except Exception as e:
-                logger.error(f"Error processing file: {str(e)}", exc_info=True)
-                return jsonify({'error': f"Error processing file: {str(e)}"}), 500
+            # Same pipeline as /stream; only the final outcome is returned
+            outcome = {'error': 'Error processing file: no result'}
+            for event, data in process_upload(filepath, filename):
+                if event in ('done', 'error'):
+                    outcome = data
+            if 'error' in outcome:
+                return jsonify(outcome), 500
+
+            document = get_document_by_id(outcome['document_id'])
+            return jsonify({
+                'functional_documentation_pdf': base64.b64encode(document.functional_pdf).decode('utf-8'),
+                'analysis_report_pdf': base64.b64encode(document.analysis_pdf).decode('utf-8'),
+                'document_id': outcome['document_id']
+            })
         
         else:
             return jsonify({'error': 'Invalid file type'}), 400
@@ -114,7 +75,198 @@ def upload_file():
         logger.error(f"Error handling upload: {str(e)}", exc_info=True)
         return jsonify({'error': f"Error handling upload: {str(e)}"}), 500
 
-from flask import jsonify
+def sse_event(event, data):
+    # Sets (local variables, data flow) are not JSON serialisable; send them as lists
+    payload = json.dumps(data, default=lambda o: sorted(o) if isinstance(o, set) else str(o))
+    return f"event: {event}\ndata: {payload}\n\n"
+
+def process_upload_events(filepath, filename):
+    """Run the upload pipeline, yielding an SSE event after every stage and procedure."""
+    for event, data in process_upload(filepath, filename):
+        if event == 'flowchart':
+            # Only stream clients get the image inline; POST / never needs it
+            with open(data.pop('path'), 'rb') as image_file:
+                data['flowchart'] = base64.b64encode(image_file.read()).decode('utf-8')
+        yield sse_event(event, data)
+
+def process_upload(filepath, filename):
+    """Run the upload pipeline, yielding (event, data) after every stage and procedure.
+
+    The last item is ('done', {...document_id...}) or ('error', {'error': ...}).
+    """
+    functional_pdf_path = None
+    analysis_pdf_path = None
+    try:
+        parser = MacroParser()
+        module_names = []
+        module_code = []
+        for module_name, code in parser.iter_vba_modules(filepath):
+            module_names.append(module_name)
+            module_code.append(code)
+        parser.macro_code = "".join(module_code)
+        yield ('modules', {'count': len(module_names), 'modules': module_names})
+
+        parsed_macros = []
+        for macro in parser.iter_parsed_macros():
+            parsed_macros.append(macro)
+            yield ('procedure', {
+                'index': len(parsed_macros) - 1,
+                'name': macro['name'],
+                'type': macro['type'],
+                'arguments': macro['arguments'],
+                'return_type': macro['return_type'],
+                'local_variables': macro['local_variables']
+            })
+
+        vectorization_reports = VectorizationDetector(parser.build_ir(parsed_macros)).score_macros(parsed_macros)
+        yield ('vectorization', {'procedures': [
+            {key: report[key] for key in ('name', 'speedup_score', 'com_calls', 'com_calls_avoided')}
+            for report in vectorization_reports
+        ]})
+
+        logic_explanations = []
+        for idx, macro in enumerate(parsed_macros):
+            explanation = parser.explain_macro_logic(macro)
+            explanation['process_flowchart'] = parser.save_process_flowchart(macro, "output", idx)
+            logic_explanations.append(explanation)
+            yield ('flowchart', {'index': idx, 'name': macro['name'], 'path': explanation['process_flowchart']})
+
+        enhanced_explanations = [None] * len(logic_explanations)
+        for idx, enhanced in iter_enhanced_explanations(logic_explanations):
+            enhanced_explanations[idx] = enhanced
+            yield ('enhancement', {'index': idx, 'name': logic_explanations[idx]['name'], 'explanation': enhanced})
+
+        analyzer = MacroQualityAnalyzer(filepath)
+        analysis_results = analyzer.analyze_macros()
+        analysis_results = f"{analysis_results}\n\n{format_report(vectorization_reports)}"
+        yield ('analysis', {'analysis': analysis_results})
+
+        functional_pdf_path = generate_sections_pdf(build_sections(logic_explanations, enhanced_explanations), f"{filename}_functional_documentation.pdf")
+        analysis_pdf_path = generate_pdf(analysis_results, f"{filename}_analysis_report.pdf")
+        with open(functional_pdf_path, 'rb') as functional_pdf_file:
+            functional_pdf_data = functional_pdf_file.read()
+        with open(analysis_pdf_path, 'rb') as analysis_pdf_file:
+            analysis_pdf_data = analysis_pdf_file.read()
+
+        document_id = save_document(filename, functional_pdf_data, analysis_pdf_data, parsed_macros, logic_explanations, parser.data_flow, parser.global_variables)
+        logger.info(f"Document saved with ID: {document_id}")
+
+        # The PDFs are fetched separately so the stream never carries them inline
+        yield ('done', {
+            'document_id': document_id,
+            'functional_documentation_pdf': f"/documents/{document_id}/functional",
+            'analysis_report_pdf': f"/documents/{document_id}/analysis"
+        })
+
+    except Exception as e:
+        logger.error(f"Error processing file: {str(e)}", exc_info=True)
+        yield ('error', {'error': f"Error processing file: {str(e)}"})
+
+    finally:
+        for path in (filepath, functional_pdf_path, analysis_pdf_path):
+            if path and os.path.exists(path):
+                os.remove(path)
+
+@app.route('/stream', methods=['POST'])
+def upload_file_stream():
+    if 'file' not in request.files:
+        return jsonify({'error': 'No file part in the request'}), 400
+
+    file = request.files['file']
+
+    if file.filename == '':
+        return jsonify({'error': 'No selected file'}), 400
+
+    if not allowed_file(file.filename):
+        return jsonify({'error': 'Invalid file type'}), 400
+
+    filename = secure_filename(file.filename)
+    filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
+    file.save(filepath)
+    logger.info(f"File saved to: {filepath}")
+
+    return Response(
+        stream_with_context(process_upload_events(filepath, filename)),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+@app.route('/transform', methods=['POST'])
+def transform_file():
+    if 'file' not in request.files:
+        return jsonify({'error': 'No file part in the request'}), 400
+
+    file = request.files['file']
+
+    if file.filename == '' or not allowed_file(file.filename):
+        return jsonify({'error': 'Invalid file type'}), 400
+
+    filename = secure_filename(file.filename)
+    filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
+    file.save(filepath)
+    try:
+        parser = MacroParser()
+        parser.load_from_excel(filepath)
+        module_ir = parser.build_ir(parser.parse_macros())
+        translator = PythonTranslator(module_ir, vectorize=request.args.get('vectorize', '1') != '0')
+        python_source = translator.translate()
+        return jsonify({
+            'python': python_source,
+            'vectorized_loops': [{'procedure': proc, 'variable': var} for proc, var in translator.vectorized_loops]
+        })
+    except Exception as e:
+        logger.error(f"Error transforming file: {str(e)}", exc_info=True)
+        return jsonify({'error': f"Error transforming file: {str(e)}"}), 500
+    finally:
+        if os.path.exists(filepath):
+            os.remove(filepath)
+
+@app.route('/export', methods=['POST'])
+def export_documentation():
+    """Functional documentation without LLM enhancement, as ?format=markdown|html|json|pdf.
+
+    Markdown, HTML and JSON come back as a zip with the flowcharts under
+    assets/, which the documents reference by relative path.
+    """
+    fmt = request.args.get('format', 'markdown')
+    if fmt not in FORMATS and fmt != 'pdf':
+        return jsonify({'error': f"Unsupported format: {fmt}"}), 400
+    if 'file' not in request.files:
+        return jsonify({'error': 'No file part in the request'}), 400
+
+    file = request.files['file']
+
+    if file.filename == '' or not allowed_file(file.filename):
+        return jsonify({'error': 'Invalid file type'}), 400
+
+    filename = secure_filename(file.filename)
+    filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
+    file.save(filepath)
+    try:
+        parser = MacroParser()
+        parser.load_from_excel(filepath)
+        logic_explanations = parser.extract_functional_logic(parser.parse_macros())
+    except Exception as e:
+        logger.error(f"Error exporting file: {str(e)}", exc_info=True)
+        return jsonify({'error': f"Error exporting file: {str(e)}"}), 500
+    finally:
+        if os.path.exists(filepath):
+            os.remove(filepath)
+
+    export_dir = tempfile.mkdtemp()
+    try:
+        if fmt == 'pdf':
+            path = generate_sections_pdf(build_sections(logic_explanations), os.path.join(export_dir, f"{filename}_functional_documentation.pdf"))
+            mimetype = 'application/pdf'
+        else:
+            write_documentation(build_sections(logic_explanations), os.path.join(export_dir, 'documentation'), fmt)
+            path = shutil.make_archive(os.path.join(export_dir, f"{filename}_documentation"), 'zip', os.path.join(export_dir, 'documentation'))
+            mimetype = 'application/zip'
+        with open(path, 'rb') as export_file:
+            data = export_file.read()
+        return send_file(io.BytesIO(data), mimetype=mimetype, download_name=os.path.basename(path), as_attachment=True)
+    finally:
+        shutil.rmtree(export_dir, ignore_errors=True)
 
 @app.route('/documents', methods=['GET'])
 def view_all_documents():
@@ -140,16 +292,38 @@ def view_document_by_id(document_id):
         return send_file(io.BytesIO(document.generated_pdf), download_name=f"{document.name}.pdf", as_attachment=True)
     return jsonify({'error': 'Document not found'}), 404
 
+@app.route('/documents/<int:document_id>/<kind>', methods=['GET'])
+def download_document_pdf(document_id, kind):
+    document = get_document_by_id(document_id)
+    if not document:
+        return jsonify({'error': 'Document not found'}), 404
+    if kind == 'functional':
+        pdf_data = document.functional_pdf
+    elif kind == 'analysis':
+        pdf_data = document.analysis_pdf
+    else:
+        return jsonify({'error': 'Unknown document kind'}), 404
+    if not pdf_data:
+        return jsonify({'error': 'PDF not available'}), 404
+    return send_file(io.BytesIO(pdf_data), mimetype='application/pdf', download_name=f"{document.name}_{kind}.pdf", as_attachment=True)
+
 @app.route('/macros', methods=['GET'])
 def view_all_macros():
     macros = get_all_macros()
-    macros_list = [{'id': macro.id, 'name': macro.name, 'document_id': macro.document_id, 'efficient': macro.efficient, 'flowchart': base64.b64encode(macro.flowchart).decode('utf-8') if macro.flowchart else None} for macro in macros]
+    macros_list = [{'id': macro.id, 'name': macro.name, 'document_id': macro.document_id, 'efficient': macro.efficient, 'speedup_score': macro.speedup_score, 'flowchart': base64.b64encode(macro.flowchart).decode('utf-8') if macro.flowchart else None} for macro in macros]
+    return jsonify(macros_list)
+
+@app.route('/macros/speedup', methods=['GET'])
+def view_macros_by_speedup():
+    limit = request.args.get('limit', type=int)
+    macros = get_macros_by_speedup(limit)
+    macros_list = [{'id': macro.id, 'name': macro.name, 'document_id': macro.document_id, 'efficient': macro.efficient, 'speedup_score': macro.speedup_score} for macro in macros]
     return jsonify(macros_list)
 
 @app.route('/macros/<int:document_id>', methods=['GET'])
 def view_macros_by_document_id(document_id):
     macros = get_macros_by_document_id(document_id)
-    macros_list = [{'id': macro.id, 'name': macro.name, 'efficient': macro.efficient, 'flowchart': base64.b64encode(macro.flowchart).decode('utf-8') if macro.flowchart else None} for macro in macros]
+    macros_list = [{'id': macro.id, 'name': macro.name, 'efficient': macro.efficient, 'speedup_score': macro.speedup_score, 'flowchart': base64.b64encode(macro.flowchart).decode('utf-8') if macro.flowchart else None} for macro in macros]
     return jsonify(macros_list)
 
 @app.route('/macros/<int:macro_id>', methods=['GET'])
@@ -161,10 +335,46 @@ def view_macro_by_id(macro_id):
             'name': macro.name,
             'document_id': macro.document_id,
             'efficient': macro.efficient,
+            'speedup_score': macro.speedup_score,
+            'vectorization_findings': json.loads(macro.vectorization_findings) if macro.vectorization_findings else [],
             'flowchart': base64.b64encode(macro.flowchart).decode('utf-8') if macro.flowchart else None
         }
         return jsonify(macro_data)
     return jsonify({'error': 'Macro not found'}), 404
 
+def procedure_to_dict(procedure):
+    return {
+        'id': procedure.id,
+        'name': procedure.name,
+        'type': procedure.type,
+        'document_id': procedure.document_id,
+        'macro_id': procedure.macro_id,
+        'arguments': procedure.arguments,
+        'return_type': procedure.return_type
+    }
+
+@app.route('/documents/<int:document_id>/procedures', methods=['GET'])
+def view_procedures_by_document_id(document_id):
+    return jsonify([procedure_to_dict(p) for p in get_procedures_by_document_id(document_id)])
+
+@app.route('/variables/<variable_name>/<direction>', methods=['GET'])
+def view_procedures_using_variable(variable_name, direction):
+    # e.g. /variables/gTotal/writers?global=1 lists procedures writing global gTotal
+    directions = {'readers': 'input', 'writers': 'output'}
+    if direction not in directions:
+        return jsonify({'error': 'Direction must be readers or writers'}), 404
+    procedures = get_procedures_using_variable(
+        variable_name,
+        directions[direction],
+        global_only=request.args.get('global') == '1',
+        document_id=request.args.get('document_id', type=int)
+    )
+    return jsonify([procedure_to_dict(p) for p in procedures])
+
+@app.route('/procedures/<procedure_name>/callers', methods=['GET'])
+def view_callers(procedure_name):
+    callers = get_callers(procedure_name, document_id=request.args.get('document_id', type=int))
+    return jsonify([procedure_to_dict(p) for p in callers])
+
 if __name__ == '__main__':
     app.run(debug=True)
@@ -1,6 +1,8 @@
-from sqlalchemy import create_engine, Column, Integer, String, LargeBinary, Boolean, ForeignKey
+import json
+from sqlalchemy import create_engine, func, inspect, text, Column, Integer, String, LargeBinary, Boolean, Float, Text, ForeignKey, Index
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker, relationship
+from sqlalchemy.schema import CreateIndex
 
 DATABASE_URI = 'sqlite:///macros.db'
 Base = declarative_base()
@@ -20,17 +22,96 @@ class Macro(Base):
     document_id = Column(Integer, ForeignKey('document.id'), nullable=False)
     flowchart = Column(LargeBinary, nullable=True)
     efficient = Column(Boolean, default=False)
+    speedup_score = Column(Float, default=1.0)
+    vectorization_findings = Column(Text, nullable=True)
+
+# Normalized parse results, so analytics run in SQL instead of re-parsing uploads
+
+class Procedure(Base):
+    __tablename__ = 'procedure'
+    id = Column(Integer, primary_key=True)
+    document_id = Column(Integer, ForeignKey('document.id'), nullable=False)
+    macro_id = Column(Integer, ForeignKey('macro.id'), nullable=True)
+    name = Column(String(120), nullable=False)
+    type = Column(String(20), nullable=False)
+    arguments = Column(Text, nullable=True)
+    return_type = Column(String(60), nullable=True)
+    code = Column(Text, nullable=True)
+    __table_args__ = (
+        Index('ix_procedure_document_name', 'document_id', 'name'),
+        Index('ix_procedure_name', 'name'),
+    )
+
+class Variable(Base):
+    __tablename__ = 'variable'
+    id = Column(Integer, primary_key=True)
+    procedure_id = Column(Integer, ForeignKey('procedure.id'), nullable=False, index=True)
+    name = Column(String(120), nullable=False)
+    scope = Column(String(10), nullable=False)  # 'local' or 'global'
+    usage_count = Column(Integer, default=0)
+    __table_args__ = (Index('ix_variable_name_scope', 'name', 'scope'),)
+
+class Assignment(Base):
+    __tablename__ = 'assignment'
+    id = Column(Integer, primary_key=True)
+    procedure_id = Column(Integer, ForeignKey('procedure.id'), nullable=False)
+    variable_name = Column(String(120), nullable=False)
+    expression = Column(Text, nullable=False)
+    __table_args__ = (
+        Index('ix_assignment_procedure_variable', 'procedure_id', 'variable_name'),
+        Index('ix_assignment_variable', 'variable_name'),
+    )
+
+class ProcedureCall(Base):
+    __tablename__ = 'procedure_call'
+    id = Column(Integer, primary_key=True)
+    caller_id = Column(Integer, ForeignKey('procedure.id'), nullable=False, index=True)
+    callee_id = Column(Integer, ForeignKey('procedure.id'), nullable=True, index=True)
+    callee_name = Column(String(120), nullable=False)
+    call_count = Column(Integer, default=1)
+    # VBA names are case-insensitive; lookups compare lower(callee_name)
+    __table_args__ = (Index('ix_procedure_call_callee_lower', func.lower(callee_name)),)
+
+class DataFlowEdge(Base):
+    __tablename__ = 'data_flow_edge'
+    id = Column(Integer, primary_key=True)
+    document_id = Column(Integer, ForeignKey('document.id'), nullable=False)
+    procedure_id = Column(Integer, ForeignKey('procedure.id'), nullable=False, index=True)
+    variable_name = Column(String(120), nullable=False)
+    direction = Column(String(10), nullable=False)  # 'input' or 'output'
+    is_global = Column(Boolean, default=False)
+    __table_args__ = (
+        Index('ix_data_flow_variable_lower', func.lower(variable_name), direction, is_global),
+        Index('ix_data_flow_document', 'document_id', 'variable_name'),
+    )
 
 engine = create_engine(DATABASE_URI)
 Base.metadata.create_all(engine)
+
+def upgrade_schema():
+    # create_all only creates missing tables; add columns and indexes introduced after a database was created
+    inspector = inspect(engine)
+    with engine.begin() as connection:
+        for table in Base.metadata.sorted_tables:
+            existing = {column['name'] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name not in existing:
+                    column_type = column.type.compile(dialect=engine.dialect)
+                    connection.execute(text(f'ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}'))
+            for index in table.indexes:
+                # Expression indexes can't be reflected, so let the database skip existing ones
+                connection.execute(CreateIndex(index, if_not_exists=True))
+
+upgrade_schema()
 Session = sessionmaker(bind=engine)
 session = Session()
 
-def save_document(name, functional_pdf_data, analysis_pdf_data, macros, logic_explanations):
+def save_document(name, functional_pdf_data, analysis_pdf_data, macros, logic_explanations, data_flow=None, global_variables=()):
     document = Document(name=name, functional_pdf=functional_pdf_data, analysis_pdf=analysis_pdf_data)
     session.add(document)
     session.commit()
 
+    macro_records = []
     for idx, macro in enumerate(macros):
         # Read flowchart file as bytes
         flowchart_path = logic_explanations[idx]['process_flowchart'] if idx < len(logic_explanations) else None
@@ -44,13 +125,60 @@ def save_document(name, functional_pdf_data, analysis_pdf_data, macros, logic_ex
             name=macro['name'],
             document_id=document.id,
             efficient=macro.get('efficient', False),
+            speedup_score=macro.get('speedup_score', 1.0),
+            vectorization_findings=json.dumps(macro.get('vectorization_findings', [])),
             flowchart=flowchart_bytes
         )
-        session.add(macro_record)
+        macro_records.append(macro_record)
 
+    session.add_all(macro_records)
+    session.flush()
+    save_procedures(document.id, macros, macro_records, data_flow or {}, set(global_variables))
     session.commit()
     return document.id
 
+def save_procedures(document_id, macros, macro_records, data_flow, global_variables):
+    procedures = [
+        Procedure(
+            document_id=document_id,
+            macro_id=record.id,
+            name=macro['name'],
+            type=macro['type'],
+            arguments=macro.get('arguments', ''),
+            return_type=macro.get('return_type', ''),
+            code=macro.get('code')
+        )
+        for macro, record in zip(macros, macro_records)
+    ]
+    session.add_all(procedures)
+    session.flush()  # assigns procedure ids for the child rows below
+    ids_by_name = {procedure.name: procedure.id for procedure in procedures}
+
+    variables, assignments, calls, edges = [], [], [], []
+    for macro, procedure in zip(macros, procedures):
+        local_variables = macro.get('local_variables', set())
+        for var, count in macro.get('variable_usage', {}).items():
+            if count or var in local_variables:
+                scope = 'local' if var in local_variables else 'global'
+                variables.append({'procedure_id': procedure.id, 'name': var, 'scope': scope, 'usage_count': count})
+        for var, expressions in macro.get('variable_assignments', {}).items():
+            for expression in expressions:
+                assignments.append({'procedure_id': procedure.id, 'variable_name': var, 'expression': expression.strip()})
+        for callee, count in macro.get('calls', {}).items():
+            calls.append({'caller_id': procedure.id, 'callee_id': ids_by_name.get(callee), 'callee_name': callee, 'call_count': count})
+        flow = data_flow.get(macro['name'], {})
+        for direction, key in (('input', 'inputs'), ('output', 'outputs')):
+            for var in flow.get(key, ()):
+                if var.startswith('global:'):
+                    continue  # already covered by the plain entry with is_global set
+                edges.append({'document_id': document_id, 'procedure_id': procedure.id, 'variable_name': var,
+                              'direction': direction, 'is_global': var in global_variables})
+
+    # One executemany per table instead of an INSERT per row
+    for model, rows in ((Variable, variables), (Assignment, assignments), (ProcedureCall, calls), (DataFlowEdge, edges)):
+        if rows:
+            session.bulk_insert_mappings(model, rows)
+
 def get_all_documents():
     return session.query(Document).all()
 
@@ -63,5 +191,34 @@ def get_all_macros():
 def get_macros_by_document_id(document_id):
     return session.query(Macro).filter(Macro.document_id == document_id).all()
 
+def get_macros_by_speedup(limit=None):
+    query = session.query(Macro).order_by(Macro.speedup_score.desc())
+    return query.limit(limit).all() if limit else query.all()
+
 def get_macro_by_id(macro_id):
     return session.query(Macro).filter(Macro.id == macro_id).first()
+
+def get_procedures_by_document_id(document_id):
+    return session.query(Procedure).filter(Procedure.document_id == document_id).all()
+
+def get_procedures_using_variable(variable_name, direction, global_only=False, document_id=None):
+    """Procedures that read (direction='input') or write (direction='output') a variable."""
+    query = (session.query(Procedure)
+             .join(DataFlowEdge, DataFlowEdge.procedure_id == Procedure.id)
+             .filter(func.lower(DataFlowEdge.variable_name) == variable_name.lower(), DataFlowEdge.direction == direction))
+    if global_only:
+        query = query.filter(DataFlowEdge.is_global.is_(True))
+    if document_id is not None:
+        query = query.filter(DataFlowEdge.document_id == document_id)
+    return query.all()
+
+def get_procedures_writing_global(variable_name, document_id=None):
+    return get_procedures_using_variable(variable_name, 'output', global_only=True, document_id=document_id)
+
+def get_callers(procedure_name, document_id=None):
+    query = (session.query(Procedure)
+             .join(ProcedureCall, ProcedureCall.caller_id == Procedure.id)
+             .filter(func.lower(ProcedureCall.callee_name) == procedure_name.lower()))
+    if document_id is not None:
+        query = query.filter(Procedure.document_id == document_id)
+    return query.all()
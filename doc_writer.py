@@ -0,0 +1,137 @@
+import html
+import json
+import os
+import re
+import shutil
+
+FORMATS = {'markdown': '.md', 'html': '.html', 'json': '.json'}
+
+FIELDS = [
+    ('name', 'Name'),
+    ('type', 'Type'),
+    ('purpose', 'Purpose'),
+    ('inputs', 'Inputs'),
+    ('process', 'Process'),
+    ('outputs', 'Outputs'),
+    ('business_impact', 'Business Impact'),
+]
+
+
+def build_sections(logic_explanations, enhanced_explanations=None):
+    """Yield one section dict per procedure.
+
+    Sections carry the structured fields, the (optional) enhanced text and the
+    flowchart path, so each output format can render them without holding the
+    whole document in memory.
+    """
+    for idx, explanation in enumerate(logic_explanations):
+        if isinstance(explanation, dict):
+            section = {
+                'name': explanation.get('name', 'Unnamed'),
+                'type': explanation.get('type', 'Macro'),
+                'fields': [(label, explanation.get(key, 'N/A')) for key, label in FIELDS[2:]],
+                'flowchart': explanation.get('process_flowchart'),
+            }
+        else:
+            section = {'name': f"Macro {idx + 1}", 'type': 'Macro', 'fields': [], 'flowchart': None}
+            section['text'] = str(explanation)
+        if enhanced_explanations is not None and idx < len(enhanced_explanations) and enhanced_explanations[idx]:
+            section['text'] = enhanced_explanations[idx]
+        yield section
+
+
+def with_assets(sections, output_dir, asset_dir='assets'):
+    """Copy each section's flowchart into output_dir/asset_dir and record its relative path.
+
+    Assets are named <index>_<name>.png, so same-named procedures from
+    different modules keep separate images.
+    """
+    os.makedirs(os.path.join(output_dir, asset_dir), exist_ok=True)
+    for idx, section in enumerate(sections):
+        flowchart = section.get('flowchart')
+        section['flowchart_ref'] = None
+        if flowchart and os.path.exists(flowchart):
+            name = re.sub(r'[^\w.-]', '_', section['name'])
+            asset = f"{asset_dir}/{idx}_{name}{os.path.splitext(flowchart)[1]}"
+            shutil.copyfile(flowchart, os.path.join(output_dir, asset))
+            section['flowchart_ref'] = asset
+        yield section
+
+
+def flowchart_ref(section):
+    """Relative asset path set by with_assets, or None; the server-local path is never linked."""
+    return section.get('flowchart_ref')
+
+
+def iter_markdown(sections, title="Functional Logic Explanation of VBA Macros"):
+    yield f"# {title}\n\n"
+    for section in sections:
+        chunk = [f"## {section['type']} {section['name']}\n"]
+        if section.get('text'):
+            chunk.append(f"{section['text']}\n")
+        else:
+            for label, value in section['fields']:
+                chunk.append(f"**{label}:** {value}\n")
+        ref = flowchart_ref(section)
+        chunk.append(f"![Process Flowchart]({ref})\n" if ref else "**Process Flowchart:** Not available\n")
+        chunk.append("---\n\n")
+        yield "\n".join(chunk)
+
+
+def iter_html(sections, title="Functional Logic Explanation of VBA Macros"):
+    yield (f"<!DOCTYPE html>\n<html>\n<head><meta charset=\"utf-8\"><title>{html.escape(title)}</title></head>\n"
+           f"<body>\n<h1>{html.escape(title)}</h1>\n")
+    for section in sections:
+        chunk = [f"<section>\n<h2>{html.escape(section['type'])} {html.escape(section['name'])}</h2>"]
+        if section.get('text'):
+            chunk.append(f"<pre>{html.escape(section['text'])}</pre>")
+        else:
+            chunk.append("<dl>")
+            for label, value in section['fields']:
+                chunk.append(f"<dt>{html.escape(label)}</dt><dd>{html.escape(str(value))}</dd>")
+            chunk.append("</dl>")
+        ref = flowchart_ref(section)
+        if ref:
+            chunk.append(f"<img src=\"{html.escape(ref)}\" alt=\"Process flowchart for {html.escape(section['name'])}\" loading=\"lazy\">")
+        chunk.append("</section>\n")
+        yield "\n".join(chunk)
+    yield "</body>\n</html>\n"
+
+
+def iter_json(sections):
+    """Stream a JSON array, one procedure object at a time.
+
+    flowchart is the asset path set by with_assets, or null: the server-local
+    path a section starts with means nothing to a client.
+    """
+    yield "[\n"
+    first = True
+    for section in sections:
+        record = {
+            'name': section['name'],
+            'type': section['type'],
+            'fields': {label: value for label, value in section['fields']},
+            'text': section.get('text'),
+            'flowchart': flowchart_ref(section),
+        }
+        yield ("" if first else ",\n") + json.dumps(record)
+        first = False
+    yield "\n]\n"
+
+
+WRITERS = {'markdown': iter_markdown, 'html': iter_html, 'json': iter_json}
+
+
+def write_documentation(sections, output_dir, fmt='markdown', basename='functional_documentation'):
+    """Write sections in the given format to output_dir, with flowcharts copied to output_dir/assets.
+
+    Returns the path of the written document.
+    """
+    if fmt not in WRITERS:
+        raise ValueError(f"Unsupported documentation format: {fmt}")
+    os.makedirs(output_dir, exist_ok=True)
+    path = os.path.join(output_dir, basename + FORMATS[fmt])
+    with open(path, 'w', encoding='utf-8') as f:
+        for chunk in WRITERS[fmt](with_assets(sections, output_dir)):
+            f.write(chunk)
+    return path
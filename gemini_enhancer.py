@@ -1,22 +1,34 @@
-import google.generativeai as genai
 import logging
+from llm_client import get_client, iter_generate_batched, DEFAULT_TOKEN_BUDGET
 
 logger = logging.getLogger(__name__)
 
-# Configure the Gemini API
-genai.configure(api_key='')
+ENHANCE_INSTRUCTION = "Enhance and expand on this VBA macro explanation. Provide a detailed explanation while maintaining the structure (Name, Type, Purpose, Inputs, Process, Outputs, Business Impact):"
 
 def enhance_explanation_with_gemini(explanation):
     try:
         logger.info(f"Enhancing explanation: {explanation}")
-        model = genai.GenerativeModel('gemini-pro')
-        prompt = f"Enhance and expand on this VBA macro explanation. Provide a detailed explanation while maintaining the structure (Name, Type, Purpose, Inputs, Process, Outputs, Business Impact):\n\n{explanation}\n\n"
+        prompt = f"{ENHANCE_INSTRUCTION}\n\n{explanation}\n\n"
         
-        response = model.generate_content(prompt)
-        
-        enhanced = response.text
+        enhanced = get_client().generate(prompt)
         logger.info(f"Enhanced explanation: {enhanced}")
         return enhanced
     except Exception as e:
         logger.error(f"Error enhancing explanation: {str(e)}", exc_info=True)
         return f"Error enhancing explanation: {str(e)}"
+
+def enhance_explanations_with_gemini(explanations, token_budget=DEFAULT_TOKEN_BUDGET):
+    """Enhance a list of explanations, packing several small macros into each request."""
+    enhanced = [None] * len(explanations)
+    for idx, text in iter_enhanced_explanations(explanations, token_budget):
+        enhanced[idx] = text
+    return enhanced
+
+def iter_enhanced_explanations(explanations, token_budget=DEFAULT_TOKEN_BUDGET):
+    """Yield (index, enhanced explanation) as each batched request comes back."""
+    items = []
+    for idx, explanation in enumerate(explanations):
+        name = explanation.get('name', f"macro_{idx}") if isinstance(explanation, dict) else f"macro_{idx}"
+        items.append((name, str(explanation)))
+    logger.info(f"Enhancing {len(items)} explanations")
+    return iter_generate_batched(ENHANCE_INSTRUCTION, items, token_budget)
@@ -0,0 +1,257 @@
+import http.client
+import json
+import logging
+import os
+import re
+import threading
+from urllib.parse import urlsplit
+
+logger = logging.getLogger(__name__)
+
+# Point GEMINI_API_BASE at a local HTTP server to run everything offline
+GEMINI_API_BASE = os.environ.get('GEMINI_API_BASE', 'https://generativelanguage.googleapis.com')
+GEMINI_API_KEY = os.environ.get('GEMINI_API_KEY', '')
+GEMINI_MODEL = os.environ.get('GEMINI_MODEL', 'gemini-pro')
+# Tokens per request (prompt and response together)
+DEFAULT_TOKEN_BUDGET = 3000
+# Response tokens the model returns at most, and a detailed explanation of one macro
+MAX_OUTPUT_TOKENS = 2048
+OUTPUT_TOKENS_PER_ITEM = 400
+CHARS_PER_TOKEN = 4
+
+
+class GeminiAPIError(RuntimeError):
+    def __init__(self, status, message):
+        super().__init__(f"Gemini API returned {status}: {message}")
+        self.status = status
+
+
+class GeminiClient:
+    """Small REST client for the Gemini generateContent endpoint.
+
+    Keep-alive connections are pooled on the client and shared by all
+    threads: a request borrows an idle connection (or opens one) and returns
+    it when the response has been read, so consecutive calls from any Flask
+    request thread reuse the same TCP/TLS sessions.
+    """
+
+    def __init__(self, api_base=GEMINI_API_BASE, api_key=GEMINI_API_KEY, model=GEMINI_MODEL, timeout=60, max_idle=4):
+        parts = urlsplit(api_base)
+        self.scheme = parts.scheme or 'https'
+        self.host = parts.netloc
+        self.base_path = parts.path.rstrip('/')
+        self.api_key = api_key
+        self.model = model
+        self.timeout = timeout
+        self.max_idle = max_idle
+        self._idle = []
+        # Cleared the first time the model rejects responseMimeType (e.g. gemini-pro)
+        self.json_mode = True
+        self._pool_lock = threading.Lock()
+
+    def _new_connection(self):
+        conn_class = http.client.HTTPSConnection if self.scheme == 'https' else http.client.HTTPConnection
+        return conn_class(self.host, timeout=self.timeout)
+
+    def _acquire(self):
+        with self._pool_lock:
+            if self._idle:
+                return self._idle.pop()
+        return self._new_connection()
+
+    def _release(self, conn):
+        with self._pool_lock:
+            if len(self._idle) < self.max_idle:
+                self._idle.append(conn)
+                return
+        conn.close()
+
+    def _post(self, path, payload):
+        body = json.dumps(payload).encode('utf-8')
+        headers = {'Content-Type': 'application/json', 'Connection': 'keep-alive'}
+        if self.api_key:
+            headers['x-goog-api-key'] = self.api_key
+
+        # Retry once on a fresh connection if the server dropped the idle one
+        for attempt in range(2):
+            conn = self._new_connection() if attempt else self._acquire()
+            try:
+                conn.request('POST', path, body=body, headers=headers)
+                response = conn.getresponse()
+                data = response.read()
+            except (http.client.HTTPException, ConnectionError, OSError):
+                conn.close()
+                if attempt:
+                    raise
+                continue
+            if response.will_close:
+                conn.close()
+            else:
+                self._release(conn)
+            break
+
+        if response.status != 200:
+            raise GeminiAPIError(response.status, data.decode('utf-8', 'replace'))
+        return json.loads(data)
+
+    def generate(self, prompt, json_output=False):
+        payload = {'contents': [{'parts': [{'text': prompt}]}]}
+        if json_output and self.json_mode:
+            payload['generationConfig'] = {'responseMimeType': 'application/json'}
+        path = f"{self.base_path}/v1beta/models/{self.model}:generateContent"
+        try:
+            result = self._post(path, payload)
+        except GeminiAPIError as e:
+            if e.status != 400 or 'generationConfig' not in payload:
+                raise
+            # Models without JSON mode answer 400; the prompt itself still asks for JSON
+            logger.warning(f"{self.model} rejected JSON mode, asking for JSON in the prompt only: {e}")
+            self.json_mode = False
+            del payload['generationConfig']
+            result = self._post(path, payload)
+        try:
+            return ''.join(part.get('text', '') for part in result['candidates'][0]['content']['parts'])
+        except (KeyError, IndexError) as e:
+            raise RuntimeError(f"Unexpected Gemini response: {result}") from e
+
+    def close(self):
+        """Close the idle pooled connections."""
+        with self._pool_lock:
+            idle, self._idle = self._idle, []
+        for conn in idle:
+            conn.close()
+
+
+_client = None
+_langchain_clients = {}
+_client_lock = threading.Lock()
+
+
+def get_client():
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = GeminiClient()
+        return _client
+
+
+def get_langchain_clients():
+    """Return the shared (chat model, embeddings) pair used by the RAG analyzer."""
+    with _client_lock:
+        if not _langchain_clients:
+            from langchain_google_genai import ChatGoogleGenerativeAI, GoogleGenerativeAIEmbeddings
+            _langchain_clients['model'] = ChatGoogleGenerativeAI(model=GEMINI_MODEL, google_api_key=GEMINI_API_KEY, temperature=0.2, convert_system_message_to_human=True)
+            _langchain_clients['embeddings'] = GoogleGenerativeAIEmbeddings(model="models/embedding-001", google_api_key=GEMINI_API_KEY)
+        return _langchain_clients['model'], _langchain_clients['embeddings']
+
+
+def estimate_tokens(text):
+    return max(1, len(text) // CHARS_PER_TOKEN)
+
+
+def pack_prompts(items, token_budget=DEFAULT_TOKEN_BUDGET, overhead_tokens=0,
+                 output_tokens_per_item=0, max_output_tokens=MAX_OUTPUT_TOKENS):
+    """Group (name, text) items into batches whose estimated size stays under token_budget.
+
+    A batch costs overhead_tokens (instruction and format text) plus, per item,
+    its text and the output_tokens_per_item its answer is expected to take;
+    the answers together must also fit in max_output_tokens, or the JSON reply
+    would be cut off. An item over budget on its own still gets a batch of its own.
+    """
+    max_items = max(1, max_output_tokens // output_tokens_per_item) if output_tokens_per_item else None
+    batches = []
+    current = []
+    current_tokens = overhead_tokens
+    for name, text in items:
+        tokens = estimate_tokens(f"### Macro: {name}\n{text}\n") + output_tokens_per_item
+        if current and (current_tokens + tokens > token_budget or len(current) == max_items):
+            batches.append(current)
+            current = []
+            current_tokens = overhead_tokens
+        current.append((name, text))
+        current_tokens += tokens
+    if current:
+        batches.append(current)
+    return batches
+
+
+def build_batch_prompt(instruction, batch):
+    sections = [
+        instruction,
+        "",
+        "Answer with a JSON object of the form "
+        '{"macros": [{"name": "<macro name>", "explanation": "<text>"}]} '
+        "containing exactly one entry per macro below, using the names exactly as given after '### Macro:'.",
+        "",
+    ]
+    for name, text in batch:
+        sections.append(f"### Macro: {name}")
+        sections.append(text)
+        sections.append("")
+    return "\n".join(sections)
+
+
+def parse_batch_response(text, names):
+    """Split a JSON batch response back into a {name: explanation} dict.
+
+    Names missing from the response are simply absent from the result.
+    """
+    # Models sometimes wrap JSON in a ```json fence even when asked not to
+    fenced = re.search(r'```(?:json)?\s*(.*?)```', text, re.DOTALL)
+    if fenced:
+        text = fenced.group(1)
+    try:
+        data = json.loads(text)
+    except ValueError:
+        logger.warning("Batch response was not valid JSON")
+        return {}
+
+    entries = data.get('macros', []) if isinstance(data, dict) else data
+    results = {}
+    if not isinstance(entries, list):
+        return results
+    for entry in entries:
+        if isinstance(entry, dict) and entry.get('name') in names:
+            results[entry['name']] = str(entry.get('explanation', ''))
+    return results
+
+
+def generate_batched(instruction, items, token_budget=DEFAULT_TOKEN_BUDGET, client=None,
+                     output_tokens_per_item=OUTPUT_TOKENS_PER_ITEM):
+    """Run instruction over every (name, text) item using as few requests as the budget allows.
+
+    Returns a list of responses aligned with items. Anything a batch response
+    did not cover is retried with a single-macro prompt.
+    """
+    outputs = [None] * len(items)
+    for idx, response in iter_generate_batched(instruction, items, token_budget, client, output_tokens_per_item):
+        outputs[idx] = response
+    return outputs
+
+
+def iter_generate_batched(instruction, items, token_budget=DEFAULT_TOKEN_BUDGET, client=None,
+                          output_tokens_per_item=OUTPUT_TOKENS_PER_ITEM):
+    """Same as generate_batched, but yields (index, response) as each batch completes."""
+    client = client or get_client()
+    # Procedures in different modules can share a name (and Foo_2 may be a
+    # real procedure), so each item is keyed by its index as "<index>:<name>"
+    keyed = [(f"{idx}:{name}", text) for idx, (name, text) in enumerate(items)]
+
+    overhead = estimate_tokens(build_batch_prompt(instruction, []))
+    for batch in pack_prompts(keyed, token_budget, overhead, output_tokens_per_item):
+        keys = {key for key, _ in batch}
+        results = {}
+        try:
+            response = client.generate(build_batch_prompt(instruction, batch), json_output=True)
+            results = parse_batch_response(response, keys)
+        except Exception as e:
+            logger.error(f"Error running batch of {len(batch)} macros: {str(e)}", exc_info=True)
+
+        for key, text in batch:
+            if key not in results:
+                try:
+                    results[key] = client.generate(f"{instruction}\n\n{text}\n\n")
+                except Exception as e:
+                    logger.error(f"Error enhancing {key}: {str(e)}", exc_info=True)
+                    results[key] = f"Error enhancing explanation: {str(e)}"
+            yield int(key.split(':', 1)[0]), results[key]
@@ -1,12 +1,10 @@
 import logging
 import os
 import re
-import win32com.client
-import pythoncom
 import graphviz
-import base64 
-import win32com.client as win32
 from oletools.olevba import VBA_Parser
+from doc_writer import build_sections, iter_markdown
+from vba_ir import Name, Assign, build_module_ir, walk, walk_expr, statement_expressions
 
 logger = logging.getLogger(__name__)
 
@@ -14,9 +12,14 @@ class MacroParser:
     def __init__(self):
         self.macro_code = ""
         self.global_variables = set()
+        self.global_declarations = []
         self.data_flow = {}
+        self.ir = None
 
     def load_from_excel(self, file_path):
+        # Only this entry point initialises COM; extract_vba_from_excel works without pywin32
+        import pythoncom
+
         pythoncom.CoInitialize()
         try:
             logger.info(f"Attempting to open file: {file_path}")
@@ -40,17 +43,25 @@ class MacroParser:
             pythoncom.CoUninitialize()
 
     def extract_vba_from_excel(self, file_path):
-        vba_code = ""
+        return "".join(code for _, code in self.iter_vba_modules(file_path))
 
+    def iter_vba_modules(self, file_path):
+        """Yield (module_name, code) for each VBA module in the workbook."""
         vba_parser = VBA_Parser(file_path)
-        if vba_parser.detect_vba_macros():
-            for (filename, stream_path, vba_filename, vba_code_chunk) in vba_parser.extract_macros():
-                vba_code += vba_code_chunk
+        try:
+            if vba_parser.detect_vba_macros():
+                for (filename, stream_path, vba_filename, vba_code_chunk) in vba_parser.extract_macros():
+                    yield vba_filename, vba_code_chunk
+        finally:
+            vba_parser.close()
 
-        vba_parser.close()
-        return vba_code
     def parse_macros(self):
+        return list(self.iter_parsed_macros())
+
+    def iter_parsed_macros(self):
+        """Yield each procedure as soon as it is parsed; data_flow is filled in once all are done."""
         self.analyze_global_variables()
+        self.ir = None
         procedures = re.split(r'(Sub |Function )', self.macro_code)[1:]
         parsed_macros = []
         
@@ -58,13 +69,22 @@ class MacroParser:
             proc_type = procedures[i].strip()
             proc_code = procedures[i] + procedures[i+1]
             name = proc_code.split("(")[0].strip().split()[-1]
-            parsed_macros.append(self.analyze_procedure(proc_type, name, proc_code))
+            macro = self.analyze_procedure(proc_type, name, proc_code)
+            parsed_macros.append(macro)
+            yield macro
         
         self.analyze_data_flow(parsed_macros)
-        return parsed_macros
+        self.analyze_calls(parsed_macros)
+
+    def build_ir(self, parsed_macros):
+        """Build (once) the statement-level IR used by the translator and loop analysis."""
+        if self.ir is None:
+            self.ir = build_module_ir(parsed_macros, self.global_variables, self.global_declarations)
+        return self.ir
 
     def analyze_global_variables(self):
-        self.global_variables = set(re.findall(r'Public\s+(\w+)', self.macro_code))
+        self.global_variables = set(re.findall(r'Public\s+(?:Const\s+)?(?!(?:Sub|Function|Property|Enum|Type)\b)(\w+)', self.macro_code))
+        self.global_declarations = re.findall(r'^[ \t]*(Public\s+(?!(?:Sub|Function|Property|Enum|Type|Declare)\b).*)$', self.macro_code, re.MULTILINE)
 
     def analyze_procedure(self, proc_type, name, code):
         args_match = re.search(r'\((.*?)\)', code)
@@ -106,14 +126,20 @@ class MacroParser:
 
     def analyze_data_flow(self, parsed_macros):
         self.data_flow = {macro['name']: {'inputs': set(), 'outputs': set()} for macro in parsed_macros}
+        module_ir = self.build_ir(parsed_macros)
         
-        for macro in parsed_macros:
-            # Identify inputs (used variables that weren't assigned in this macro)
-            inputs = set(macro['variable_usage'].keys()) - set(macro['variable_assignments'].keys())
+        for macro, proc in zip(parsed_macros, module_ir.procedures):
+            # Both dicts have a key for every known variable; only count ones actually used/assigned
+            assigned = {var for var, values in macro['variable_assignments'].items() if values}
+            used = {var for var, count in macro['variable_usage'].items() if count}
+
+            # Identify inputs: variables read anywhere (gTotal = gTotal + n reads gTotal too),
+            # plus used variables that are never assigned here
+            inputs = (used - assigned) | self.variables_read(proc, used)
             self.data_flow[macro['name']]['inputs'] = inputs
 
             # Identify outputs (assigned variables)
-            outputs = set(macro['variable_assignments'].keys())
+            outputs = set(assigned)
             self.data_flow[macro['name']]['outputs'] = outputs
 
             # Check for global variable modifications
@@ -121,7 +147,42 @@ class MacroParser:
                 if var in outputs:
                     self.data_flow[macro['name']]['outputs'].add(f"global:{var}")
 
-    def generate_markdown_documentation(self, parsed_macros):
+    def variables_read(self, proc, variables):
+        """Variables whose value a procedure reads, i.e. referenced anywhere but as an assignment target."""
+        names = {var.lower(): var for var in variables}
+        read = set()
+        for stmt in walk(proc.body):
+            for expr in statement_expressions(stmt):
+                if isinstance(stmt, Assign) and expr is stmt.target and isinstance(expr, Name):
+                    continue
+                for node in walk_expr(expr):
+                    if isinstance(node, Name) and node.name.lower() in names:
+                        read.add(names[node.name.lower()])
+        return read
+
+    def analyze_calls(self, parsed_macros):
+        """Count calls between procedures from the IR, so names in comments and strings don't count."""
+        module_ir = self.build_ir(parsed_macros)
+        names = {macro['name'].lower(): macro['name'] for macro in parsed_macros}
+        for macro, proc in zip(parsed_macros, module_ir.procedures):
+            macro['calls'] = {}
+            for stmt in walk(proc.body):
+                for expr in statement_expressions(stmt):
+                    for node in walk_expr(expr):
+                        # Call Helper, Helper x, Helper(x) and x = Helper(...) all reference a Name node
+                        callee = names.get(node.name.lower()) if isinstance(node, Name) else None
+                        if callee and callee != macro['name']:
+                            macro['calls'][callee] = macro['calls'].get(callee, 0) + 1
+
+    def generate_markdown_documentation(self, parsed_macros, include_code=False):
+        return "\n".join(self.iter_markdown_documentation(parsed_macros, include_code))
+
+    def iter_markdown_documentation(self, parsed_macros, include_code=False):
+        """Yield the analysis document one procedure at a time.
+
+        Source code is only embedded when include_code is set; otherwise a
+        line count is given, which keeps documents for large workbooks small.
+        """
         doc = []
         doc.append("# VBA Macro Analysis\n")
 
@@ -129,8 +190,10 @@ class MacroParser:
         for var in self.global_variables:
             doc.append(f"- `{var}`")
         doc.append("\n")
+        yield "\n".join(doc)
 
         for macro in parsed_macros:
+            doc = []
             doc.append(f"## {macro['type']} {macro['name']}")
             doc.append(f"**Arguments:** {macro['arguments']}")
             if macro['type'] == 'Function':
@@ -152,19 +215,23 @@ class MacroParser:
             doc.append(f"**Inputs:** {', '.join(self.data_flow[macro['name']]['inputs'])}")
             doc.append(f"**Outputs:** {', '.join(self.data_flow[macro['name']]['outputs'])}")
             
-            doc.append("### Code")
-            doc.append("```vba")
-            doc.append(macro['code'])
-            doc.append("```")
+            if include_code:
+                doc.append("### Code")
+                doc.append("```vba")
+                doc.append(macro['code'])
+                doc.append("```")
+            else:
+                doc.append(f"**Code:** {len(macro['code'].splitlines())} lines")
             doc.append("\n")
+            yield "\n".join(doc)
 
+        doc = []
         doc.append("## Overall Data Flow")
         for macro_name, flow in self.data_flow.items():
             doc.append(f"### {macro_name}")
             doc.append(f"**Inputs:** {', '.join(flow['inputs'])}")
             doc.append(f"**Outputs:** {', '.join(flow['outputs'])}")
-        
-        return "\n".join(doc)
+        yield "\n".join(doc)
     
     def infer_purpose(self, macro):
         name = macro['name'].lower()
@@ -264,10 +331,10 @@ class MacroParser:
 
     def extract_functional_logic(self, parsed_macros, output_dir="output"):
         logic_explanations = []
-        for macro in parsed_macros:
+        for idx, macro in enumerate(parsed_macros):
             explanation = self.explain_macro_logic(macro)
             if isinstance(explanation, dict):
-                flowchart_file = self.save_process_flowchart(macro, output_dir)
+                flowchart_file = self.save_process_flowchart(macro, output_dir, idx)
                 explanation['process_flowchart'] = flowchart_file
             logic_explanations.append(explanation)
         return logic_explanations
@@ -284,38 +351,8 @@ class MacroParser:
         }
 
     def generate_functional_documentation(self, logic_explanations):
-        doc = []
-        doc.append("# Functional Logic Explanation of VBA Macros\n")
-
-        for explanation in logic_explanations:
-            if isinstance(explanation, dict):
-                # If explanation is a dictionary, use the structured format
-                doc.append(f"**Name:** {explanation.get('name', 'Unnamed')}\n")
-                doc.append(f"**Type:** {explanation.get('type', 'Macro')}\n")
-                doc.append(f"**Purpose:** {explanation.get('purpose', 'N/A')}\n")
-                doc.append(f"**Inputs:**\n{explanation.get('inputs', 'N/A')}\n")
-                doc.append(f"**Process:**\n{explanation.get('process', 'N/A')}\n")
-                doc.append(f"**Outputs:**\n{explanation.get('outputs', 'N/A')}\n")
-                doc.append(f"**Business Impact:**\n{explanation.get('business_impact', 'N/A')}\n")
-                
-                if 'process_flowchart' in explanation:
-                    flowchart_path = explanation['process_flowchart']
-                    if os.path.exists(flowchart_path):
-                        with open(flowchart_path, "rb") as image_file:
-                            encoded_string = base64.b64encode(image_file.read()).decode()
-                        doc.append(f"**Process Flowchart:**\n")
-                        doc.append(f"![Process Flowchart](data:image/png;base64,{encoded_string})\n")
-                    else:
-                        doc.append(f"**Process Flowchart:** Flowchart image not found at {flowchart_path}\n")
-                else:
-                    doc.append("**Process Flowchart:** Not available\n")
-            else:
-                # If explanation is a string, append it as is
-                doc.append(explanation)
-            
-            doc.append("---\n")
-
-        return "\n".join(doc)
+        """Markdown functional document; doc_writer.write_documentation also copies the flowcharts."""
+        return "".join(iter_markdown(build_sections(logic_explanations)))
 
     def generate_process_flowchart(self, macro):
         dot = graphviz.Digraph(comment=f'Process Flow for {macro["name"]}')
@@ -348,11 +385,13 @@ class MacroParser:
 
         return dot
 
-    def save_process_flowchart(self, macro, output_dir):
+    def save_process_flowchart(self, macro, output_dir, index=None):
         dot = self.generate_process_flowchart(macro)
         if not os.path.exists(output_dir):
             os.makedirs(output_dir)
-        output_file = os.path.join(output_dir, f"{macro['name']}_process_flow")
+        # Procedures in different modules can share a name; the index keeps their files apart
+        prefix = f"{index}_" if index is not None else ""
+        output_file = os.path.join(output_dir, f"{prefix}{macro['name']}_process_flow")
         dot.render(output_file, format='png', cleanup=True)
         return f"{output_file}.png"
     
@@ -1,3 +1,5 @@
+import os
+import struct
 from fpdf import FPDF
 
 def generate_pdf(pdf_data, filename):
@@ -21,3 +23,58 @@ def generate_pdf(pdf_data, filename):
     pdf.output(pdf_path)
     
     return pdf_path
+
+
+def pdf_text(text):
+    # The core FPDF fonts only cover latin-1
+    return str(text).encode('latin-1', 'replace').decode('latin-1')
+
+def png_size(path):
+    with open(path, 'rb') as f:
+        header = f.read(24)
+    if header[:8] != b'\x89PNG\r\n\x1a\n':
+        return None
+    return struct.unpack('>II', header[16:24])
+
+def add_image(pdf, path):
+    # Scale to the page width, or to the page height for tall flowcharts, keeping the aspect ratio
+    max_w = pdf.w - pdf.l_margin - pdf.r_margin
+    max_h = pdf.h - pdf.t_margin - pdf.b_margin
+    size = png_size(path)
+    w, h = max_w, 0
+    if size and size[0]:
+        h = max_w * size[1] / size[0]
+        if h > max_h:
+            w, h = max_h * size[0] / size[1], max_h
+        if pdf.get_y() + h > pdf.h - pdf.b_margin:
+            pdf.add_page()
+    pdf.image(path, w=w, h=h)
+
+def generate_sections_pdf(sections, filename, title="Functional Documentation"):
+    """Write one page (or more) per procedure section; flowcharts are embedded as images."""
+    pdf = FPDF()
+    pdf.set_auto_page_break(auto=True, margin=15)
+
+    pdf.add_page()
+    pdf.set_font("Arial", 'B', size=16)
+    pdf.cell(200, 10, txt=pdf_text(title), ln=True, align='C')
+    pdf.ln(10)
+
+    for section in sections:
+        pdf.add_page()
+        pdf.set_font("Arial", 'B', size=14)
+        pdf.multi_cell(0, 10, pdf_text(f"{section['type']} {section['name']}"))
+        pdf.ln(2)
+        pdf.set_font("Arial", size=11)
+        if section.get('text'):
+            pdf.multi_cell(0, 7, pdf_text(section['text']))
+        else:
+            for label, value in section['fields']:
+                pdf.multi_cell(0, 7, pdf_text(f"{label}: {value}"))
+        flowchart = section.get('flowchart')
+        if flowchart and os.path.exists(flowchart):
+            pdf.ln(4)
+            add_image(pdf, flowchart)
+
+    pdf.output(filename)
+    return filename
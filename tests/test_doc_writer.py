@@ -0,0 +1,39 @@
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from doc_writer import build_sections, iter_json, write_documentation
+
+
+def explanations(flowchart):
+    return [{'name': 'Main', 'type': 'Sub', 'purpose': 'Test', 'process_flowchart': flowchart}]
+
+
+def test_json_flowchart_is_an_asset_path_or_null(tmp_path):
+    flowchart = tmp_path / 'Main_process_flow.png'
+    flowchart.write_bytes(b'png')
+
+    records = json.loads(''.join(iter_json(build_sections(explanations(str(flowchart))))))
+    assert records[0]['flowchart'] is None
+
+    path = write_documentation(build_sections(explanations(str(flowchart))), str(tmp_path / 'docs'), 'json')
+    with open(path, encoding='utf-8') as f:
+        records = json.load(f)
+    assert records[0]['flowchart'] == 'assets/0_Main.png'
+    assert (tmp_path / 'docs' / records[0]['flowchart']).exists()
+
+
+def test_same_named_procedures_keep_separate_assets(tmp_path):
+    sections = []
+    for idx, content in enumerate([b'first', b'second']):
+        flowchart = tmp_path / f"{idx}_Main_process_flow.png"
+        flowchart.write_bytes(content)
+        sections += build_sections(explanations(str(flowchart)))
+
+    path = write_documentation(sections, str(tmp_path / 'docs'), 'json')
+    with open(path, encoding='utf-8') as f:
+        records = json.load(f)
+    assert [r['flowchart'] for r in records] == ['assets/0_Main.png', 'assets/1_Main.png']
+    assert [(tmp_path / 'docs' / r['flowchart']).read_bytes() for r in records] == [b'first', b'second']
@@ -0,0 +1,119 @@
+import json
+import os
+import re
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from llm_client import GeminiClient, generate_batched, pack_prompts
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    """Local stand-in for generateContent.
+
+    Batch prompts get every "### Macro:" section answered except those whose
+    text contains SKIP, wrapped in a ```json fence; single prompts echo the
+    macro text back. With server.reject_json_mode, JSON-mode requests get a
+    400 like models without responseMimeType support.
+    """
+    protocol_version = 'HTTP/1.1'
+
+    def do_POST(self):
+        payload = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+        prompt = payload['contents'][0]['parts'][0]['text']
+        self.server.requests.append(payload)
+        self.server.connections.add(self.client_address)
+        if self.server.reject_json_mode and 'generationConfig' in payload:
+            self.respond(400, {'error': {'message': 'JSON mode is not enabled for this model'}})
+            return
+        if '### Macro:' in prompt:
+            sections = re.findall(r'^### Macro: (.+)\n(.*)$', prompt, re.MULTILINE)
+            macros = [{'name': name, 'explanation': f"batched {text}"} for name, text in sections if 'SKIP' not in text]
+            text = f"```json\n{json.dumps({'macros': macros})}\n```"
+        else:
+            text = f"single {prompt.split(chr(10) * 2)[1]}"
+        self.respond(200, {'candidates': [{'content': {'parts': [{'text': text}]}}]})
+
+    def respond(self, status, payload):
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StandInHandler)
+    server.requests = []
+    server.connections = set()
+    server.reject_json_mode = False
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def test_batches_split_by_index_with_single_macro_fallback(server):
+    client = GeminiClient(api_base=f"http://127.0.0.1:{server.server_port}", api_key='')
+    # Duplicate names, a real Foo_2 and an item the batch response leaves out
+    items = [('Foo', 'one'), ('Foo_2', 'two'), ('Foo', 'three'), ('Bar', 'SKIP four'), ('Baz', 'five')]
+
+    # 1000 expected output tokens per macro: two answers fit in MAX_OUTPUT_TOKENS
+    outputs = generate_batched("Explain", items, client=client, output_tokens_per_item=1000)
+    client.close()
+
+    assert outputs == ['batched one', 'batched two', 'batched three', 'single SKIP four', 'batched five']
+    # Batches [0, 1], [2, 3] and [4], plus one fallback for the skipped item
+    json_requests = [r for r in server.requests if 'generationConfig' in r]
+    assert len(json_requests) == 3
+    assert len(server.requests) == 4
+    # Every request went over one keep-alive connection
+    assert len(server.connections) == 1
+
+
+def test_connections_are_shared_across_threads(server):
+    client = GeminiClient(api_base=f"http://127.0.0.1:{server.server_port}", api_key='')
+    for _ in range(3):
+        # Like Werkzeug's threaded server: each call on a thread of its own
+        thread = threading.Thread(target=client.generate, args=("Explain\n\ntext\n\n",))
+        thread.start()
+        thread.join()
+    client.close()
+
+    assert len(server.requests) == 3
+    assert len(server.connections) == 1
+
+
+def test_batches_fall_back_to_prompt_only_json(server):
+    server.reject_json_mode = True
+    client = GeminiClient(api_base=f"http://127.0.0.1:{server.server_port}", api_key='')
+    items = [('Foo', 'one'), ('Bar', 'two'), ('Baz', 'three')]
+
+    outputs = generate_batched("Explain", items, client=client, output_tokens_per_item=1000)
+    client.close()
+
+    assert outputs == ['batched one', 'batched two', 'batched three']
+    # Only the first batch tried JSON mode; the rest went straight to prompt-only JSON
+    assert [('generationConfig' in r) for r in server.requests] == [True, False, False]
+    assert not client.json_mode
+
+
+def test_budget_counts_prompt_overhead_and_expected_output():
+    items = [(f"m{idx}", 'x' * 400) for idx in range(10)]  # 100 input tokens each
+    assert len(pack_prompts(items, token_budget=3000)) == 1
+    # 500 tokens overhead + 10 x (100 + 400 output) would be 5500
+    batches = pack_prompts(items, token_budget=3000, overhead_tokens=500, output_tokens_per_item=400)
+    assert [len(batch) for batch in batches] == [4, 4, 2]
+    # The answers alone must fit in the model's output limit
+    batches = pack_prompts(items, token_budget=100000, output_tokens_per_item=700, max_output_tokens=2048)
+    assert [len(batch) for batch in batches] == [2, 2, 2, 2, 2]
@@ -0,0 +1,56 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from macro_parser import MacroParser
+
+CODE = '''Public gTotal As Double
+
+Sub Main()
+    ' Helper is only mentioned here
+    MsgBox "run Helper"
+    Call Helper
+    helper 2
+    gTotal = Square(3)
+End Sub
+
+Sub Helper(Optional n As Integer = 1)
+    gTotal = gTotal + n
+End Sub
+
+Function Square(x As Double) As Double
+    Square = x * x
+End Function
+'''
+
+
+def parse():
+    parser = MacroParser()
+    parser.macro_code = CODE
+    return {macro['name']: macro for macro in parser.parse_macros()}
+
+
+def test_calls_ignore_comments_and_strings():
+    macros = parse()
+    assert macros['Main']['calls'] == {'Helper': 2, 'Square': 1}
+    assert macros['Helper']['calls'] == {}
+    assert macros['Square']['calls'] == {}
+
+
+def test_read_then_written_variable_is_an_input():
+    parser = MacroParser()
+    parser.macro_code = CODE
+    parser.parse_macros()
+    assert 'gTotal' in parser.data_flow['Helper']['inputs']
+    assert 'gTotal' in parser.data_flow['Helper']['outputs']
+    # Main only writes gTotal
+    assert 'gTotal' not in parser.data_flow['Main']['inputs']
+
+
+def test_functional_documentation_does_not_link_server_paths():
+    parser = MacroParser()
+    explanations = [{'name': 'Main', 'type': 'Sub', 'purpose': 'Test', 'process_flowchart': 'output/Main_process_flow.png'}]
+    document = parser.generate_functional_documentation(explanations)
+    assert '## Sub Main' in document
+    assert 'output/' not in document
@@ -0,0 +1,115 @@
+import os
+import sys
+import types
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from vba_ir import Raw, If, build_module_ir, walk
+from vba_translator import PythonTranslator
+
+
+def translate(code, name='Test', **kwargs):
+    module_ir = build_module_ir([{'name': name, 'type': 'Sub', 'code': code}], **kwargs)
+    return module_ir, PythonTranslator(module_ir).translate()
+
+
+def run(source, name='Test', *args):
+    module = types.ModuleType('translation')
+    exec(compile(source, '<translation>', 'exec'), module.__dict__)
+    printed = []
+    module.print = lambda *values: printed.append(' '.join(str(v) for v in values))
+    getattr(module, name)(types.SimpleNamespace(active=None), *args)
+    return printed
+
+
+SELECT_CASE = '''Sub Test(x)
+    Select Case x
+        Case 1
+            MsgBox "one"
+        Case 2 To 4, 9
+            MsgBox "few"
+        Case Is > 10
+            MsgBox "many"
+        Case Else
+            MsgBox "other"
+    End Select
+End Sub'''
+
+
+def test_select_case_becomes_if_chain():
+    module_ir, source = translate(SELECT_CASE)
+    statements = list(walk(module_ir.procedures[0].body))
+    assert not any(isinstance(stmt, Raw) for stmt in statements)
+    assert isinstance(statements[0], If) and len(statements[0].branches) == 3
+    assert 'TODO' not in source
+
+    assert run(source, 'Test', 1) == ['one']
+    assert run(source, 'Test', 3) == ['few']
+    assert run(source, 'Test', 9) == ['few']
+    assert run(source, 'Test', 11) == ['many']
+    assert run(source, 'Test', 5) == ['other']
+
+
+def test_statements_after_colon_are_kept():
+    module_ir, source = translate('''Sub Test()
+    Dim x As Integer: x = 5
+    Select Case x: Case 5: MsgBox "five": Case Else: MsgBox "other": End Select
+    If x > 1 Then MsgBox "big": MsgBox "really" Else MsgBox "small"
+    MsgBox "a:b"
+End Sub''')
+    assert 'TODO' not in source
+    assert run(source) == ['five', 'big', 'really', 'a:b']
+
+
+def test_globals_start_from_declared_type():
+    code = '''Sub Test()
+    gTotal = gTotal + 1.5
+    gCount = gCount + RATE
+    MsgBox gTotal & " " & gCount
+End Sub'''
+    declarations = ['Public gTotal As Double', 'Public gCount As Long', 'Public Const RATE = 2']
+    module_ir, source = translate(code, global_variables={'gTotal', 'gCount', 'RATE'}, declarations=declarations)
+    assert 'gTotal = 0.0' in source and 'gCount = 0' in source and 'RATE = 2' in source
+    assert run(source) == ['1.5 2']
+
+
+def test_empty_cells_count_as_zero():
+    openpyxl = pytest.importorskip('openpyxl')
+    pytest.importorskip('pandas')
+    # Empty is 0 in arithmetic, but a plain copy keeps the cell empty
+    cases = [
+        ('Cells(i, 2) = Cells(i, 1) * 2', [1, None, 3, 4], [2, 0, 6, 8]),
+        ('Cells(i, 2) = Cells(i, 1)', [1, None, 'abc', 4], [1, None, 'abc', 4]),
+    ]
+    for statement, column, expected in cases:
+        code = f"Sub Test()\n    For i = 1 To 4: {statement}: Next i\nEnd Sub"
+        module_ir = build_module_ir([{'name': 'Test', 'type': 'Sub', 'code': code}])
+        for vectorize in (False, True):
+            translator = PythonTranslator(module_ir, vectorize=vectorize)
+            module = types.ModuleType('translation')
+            exec(compile(translator.translate(), '<translation>', 'exec'), module.__dict__)
+            wb = openpyxl.Workbook()
+            for row, value in enumerate(column, start=1):
+                wb.active.cell(row=row, column=1, value=value)
+            module.Test(wb)
+            assert bool(translator.vectorized_loops) == vectorize
+            values = [wb.active.cell(row=row, column=2).value for row in range(1, 5)]
+            assert values == expected
+            assert [type(value) for value in values] == [type(value) for value in expected]
+
+
+def test_statements_on_elseif_and_else_lines_are_kept():
+    module_ir, source = translate('''Sub Test(x)
+    If x = 1 Then
+        MsgBox "one"
+    ElseIf x = 2 Then MsgBox "two"
+    ElseIf x = 3 Then MsgBox "three": MsgBox "!"
+    Else MsgBox "other"
+    End If
+End Sub''')
+    assert 'TODO' not in source
+    assert run(source, 'Test', 2) == ['two']
+    assert run(source, 'Test', 3) == ['three', '!']
+    assert run(source, 'Test', 4) == ['other']
@@ -0,0 +1,85 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from vba_ir import build_module_ir
+from vectorization_detector import VectorizationDetector
+
+
+def analyze(code):
+    module_ir = build_module_ir([{'name': 'Test', 'type': 'Sub', 'code': code}])
+    return VectorizationDetector(module_ir).analyze()[0]
+
+
+def test_with_block_sheet_is_not_a_per_iteration_lookup():
+    report = analyze('''Sub Test()
+    With Worksheets("Data")
+        For i = 1 To 100
+            .Cells(i, 2) = .Cells(i, 1) * 2
+        Next i
+    End With
+End Sub''')
+    kinds = [finding['kind'] for finding in report['findings']]
+    assert kinds == ['cell_access']
+    assert report['com_calls'] == 200
+
+
+def test_formatting_is_not_a_bulk_value_access():
+    report = analyze('''Sub Test()
+    For i = 1 To 100
+        If Cells(i, 1) > 10 Then Cells(i, 1).Interior.Color = RGB(255, 0, 0)
+    Next i
+End Sub''')
+    findings = {finding['kind']: finding for finding in report['findings']}
+    assert findings['cell_access']['calls_per_iteration'] == 1
+    assert findings['cell_format']['com_calls'] == findings['cell_format']['com_calls_after'] == 100
+    assert 'Range.Value' not in findings['cell_format']['detail'].split(';')[0]
+
+
+def test_literal_inner_loop_is_not_run_time_sized():
+    report = analyze('''Sub Test()
+    For r = 1 To lastRow
+        For c = 1 To 1000
+            total = total + r * c
+        Next c
+    Next r
+End Sub''')
+    assert 'nested_loop' not in [finding['kind'] for finding in report['findings']]
+
+
+def test_do_while_condition_is_read_every_iteration():
+    report = analyze('''Sub Test()
+    i = 2
+    Do While Cells(i, 1).Value <> ""
+        i = i + 1
+    Loop
+End Sub''')
+    findings = {finding['kind']: finding for finding in report['findings']}
+    assert findings['cell_access']['calls_per_iteration'] == 1
+    assert report['com_calls'] == 1000
+    assert report['speedup_score'] > 1.0
+
+
+def test_for_each_over_used_range_counts_cell_variable_access():
+    report = analyze('''Sub Test()
+    For Each c In ActiveSheet.UsedRange
+        c.Value = c.Value * 2
+    Next c
+End Sub''')
+    accesses = [finding for finding in report['findings'] if finding['kind'] == 'cell_access']
+    # One Range object fetched per cell, then one read and one write on it
+    assert [finding['calls_per_iteration'] for finding in accesses] == [1, 2]
+    assert report['speedup_score'] > 1.0
+
+
+def test_nested_loops_over_used_range_rows():
+    report = analyze('''Sub Test()
+    For Each r In ActiveSheet.UsedRange.Rows
+        For Each c In r.Cells
+            If c.Value < 0 Then c.Interior.Color = vbRed
+        Next c
+    Next r
+End Sub''')
+    kinds = [finding['kind'] for finding in report['findings']]
+    assert 'nested_loop' in kinds and 'cell_format' in kinds
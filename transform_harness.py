@@ -0,0 +1,198 @@
+import logging
+import os
+import shutil
+import sys
+import time
+import types
+
+from openpyxl import Workbook, load_workbook
+
+from macro_parser import MacroParser
+from vba_translator import PythonTranslator
+
+logger = logging.getLogger(__name__)
+
+
+class ExcelUnavailable(Exception):
+    """Excel cannot be driven over COM: no pywin32, no Excel, or Excel failed to start."""
+
+
+def create_sample_workbook(file_path, rows=10000, columns=3, template_path=None):
+    """Write a header row and `rows` rows of numbers in the first `columns` columns.
+
+    With template_path, the data goes into the first sheet of a copy of that
+    workbook, so its macros run against it; otherwise a new workbook is created.
+    """
+    if template_path:
+        wb = load_workbook(template_path, keep_vba=template_path.lower().endswith('.xlsm'))
+        ws = wb.worksheets[0]
+    else:
+        wb = Workbook()
+        ws = wb.active
+        ws.title = "Sheet1"
+    for column in range(1, columns + 1):
+        ws.cell(row=1, column=column, value=f"Col{column}")
+    for row in range(2, rows + 2):
+        for column in range(1, columns + 1):
+            ws.cell(row=row, column=column, value=(row * column) % 97 + 0.5 * column)
+    wb.save(file_path)
+    return file_path
+
+
+def translate_workbook(file_path):
+    """Return (scalar_source, vectorized_source, vectorized_loops) for the workbook's macros."""
+    parser = MacroParser()
+    parser.macro_code = parser.extract_vba_from_excel(file_path)
+    module_ir = parser.build_ir(parser.parse_macros())
+
+    scalar_source = PythonTranslator(module_ir, vectorize=False).translate()
+    translator = PythonTranslator(module_ir, vectorize=True)
+    vectorized_source = translator.translate()
+    return scalar_source, vectorized_source, translator.vectorized_loops
+
+
+def load_translation(source, module_name="vba_translation"):
+    module = types.ModuleType(module_name)
+    exec(compile(source, f"<{module_name}>", "exec"), module.__dict__)
+    return module
+
+
+def run_python(source, macro_name, workbook_path, output_path):
+    """Run a translated macro on a copy of the workbook; return the macro's run time in seconds."""
+    module = load_translation(source)
+    keep_vba = workbook_path.lower().endswith('.xlsm')
+    wb = load_workbook(workbook_path, keep_vba=keep_vba)
+    start = time.perf_counter()
+    getattr(module, macro_name)(wb)
+    elapsed = time.perf_counter() - start
+    wb.save(output_path)
+    return elapsed
+
+
+def run_vba(workbook_path, macro_name, output_path):
+    """Run the original macro in Excel on a copy of the workbook; return its run time in seconds.
+
+    Raises ExcelUnavailable when pywin32 is missing or Excel cannot be started.
+    """
+    try:
+        import pythoncom
+        import win32com.client as win32
+    except ImportError as e:
+        raise ExcelUnavailable(f"pywin32 is not available: {e}") from e
+
+    shutil.copyfile(workbook_path, output_path)
+    pythoncom.CoInitialize()
+    excel = None
+    try:
+        try:
+            excel = win32.DispatchEx("Excel.Application")
+        except pythoncom.com_error as e:
+            raise ExcelUnavailable(f"Excel could not be started: {e}") from e
+        excel.Visible = False
+        excel.DisplayAlerts = False
+        workbook = excel.Workbooks.Open(os.path.abspath(output_path))
+        start = time.perf_counter()
+        excel.Application.Run(f"'{workbook.Name}'!{macro_name}")
+        elapsed = time.perf_counter() - start
+        workbook.Save()
+        workbook.Close(SaveChanges=False)
+        return elapsed
+    finally:
+        if excel is not None:
+            excel.Quit()
+        pythoncom.CoUninitialize()
+
+
+def compare_workbooks(expected_path, actual_path, tolerance=1e-9, limit=50):
+    """Return up to `limit` (sheet, cell, expected, actual) tuples where cell values differ."""
+    expected = load_workbook(expected_path, data_only=True)
+    actual = load_workbook(actual_path, data_only=True)
+    differences = []
+    for sheet_name in expected.sheetnames:
+        if sheet_name not in actual.sheetnames:
+            differences.append((sheet_name, None, 'present', 'missing'))
+            continue
+        ws_expected, ws_actual = expected[sheet_name], actual[sheet_name]
+        max_row = max(ws_expected.max_row, ws_actual.max_row)
+        max_col = max(ws_expected.max_column, ws_actual.max_column)
+        for row in range(1, max_row + 1):
+            for column in range(1, max_col + 1):
+                a = ws_expected.cell(row=row, column=column).value
+                b = ws_actual.cell(row=row, column=column).value
+                if values_match(a, b, tolerance):
+                    continue
+                differences.append((sheet_name, ws_expected.cell(row=row, column=column).coordinate, a, b))
+                if len(differences) >= limit:
+                    return differences
+    return differences
+
+
+def values_match(a, b, tolerance):
+    if isinstance(a, (int, float)) and isinstance(b, (int, float)) and not isinstance(a, bool):
+        return abs(a - b) <= tolerance * max(1.0, abs(a), abs(b))
+    return a == b or (a in (None, '') and b in (None, ''))
+
+
+def benchmark(workbook_path, macro_name, output_dir="output", sample_rows=None):
+    """Run a macro as VBA (when Excel is available) and as both Python translations.
+
+    The VBA run is the reference; without Excel the scalar translation is used
+    instead, which still checks that vectorizing loops did not change results.
+    With sample_rows, every run uses a copy of the workbook whose first sheet
+    is filled by create_sample_workbook.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    base = os.path.splitext(os.path.basename(workbook_path))[0]
+    extension = os.path.splitext(workbook_path)[1]
+    if sample_rows:
+        # Macros are translated from the original; the runs use the sample data
+        sample_path = create_sample_workbook(os.path.join(output_dir, f"{base}_sample{extension}"),
+                                             rows=sample_rows, template_path=workbook_path)
+    else:
+        sample_path = workbook_path
+    scalar_source, vectorized_source, vectorized_loops = translate_workbook(workbook_path)
+
+    outputs = {
+        'python_scalar': os.path.join(output_dir, f"{base}_{macro_name}_scalar{extension}"),
+        'python_vectorized': os.path.join(output_dir, f"{base}_{macro_name}_vectorized{extension}"),
+    }
+    timings = {
+        'python_scalar': run_python(scalar_source, macro_name, sample_path, outputs['python_scalar']),
+        'python_vectorized': run_python(vectorized_source, macro_name, sample_path, outputs['python_vectorized']),
+    }
+
+    reference = 'python_scalar'
+    try:
+        outputs['vba'] = os.path.join(output_dir, f"{base}_{macro_name}_vba{extension}")
+        timings['vba'] = run_vba(sample_path, macro_name, outputs['vba'])
+        reference = 'vba'
+    except ExcelUnavailable as e:
+        logger.warning(f"{e}; comparing against the scalar translation only")
+        outputs.pop('vba')
+
+    mismatches = {
+        name: compare_workbooks(outputs[reference], path)
+        for name, path in outputs.items() if name != reference
+    }
+    return {
+        'macro': macro_name,
+        'reference': reference,
+        'vectorized_loops': vectorized_loops,
+        'timings': timings,
+        'speedup': {name: timings[reference] / elapsed for name, elapsed in timings.items() if elapsed},
+        'mismatches': mismatches,
+        'outputs': outputs,
+    }
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    if len(sys.argv) < 3:
+        print("Usage: python transform_harness.py <workbook.xlsm> <MacroName> [sample_rows]")
+        sys.exit(1)
+    report = benchmark(sys.argv[1], sys.argv[2], sample_rows=int(sys.argv[3]) if len(sys.argv) > 3 else None)
+    for name, elapsed in report['timings'].items():
+        print(f"{name}: {elapsed:.4f}s (x{report['speedup'][name]:.2f} vs {report['reference']})")
+    print(f"Vectorized loops: {report['vectorized_loops']}")
+    for name, differences in report['mismatches'].items():
+        print(f"{name}: {'matches' if not differences else f'{len(differences)} differing cells'}")
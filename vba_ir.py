@@ -0,0 +1,713 @@
+import logging
+import re
+from dataclasses import dataclass, field
+from typing import List, Optional
+
+logger = logging.getLogger(__name__)
+
+# ---------------------------------------------------------------------------
+# Expression nodes
+# ---------------------------------------------------------------------------
+
+@dataclass
+class Num:
+    value: object
+
+@dataclass
+class Str:
+    value: str
+
+@dataclass
+class Name:
+    name: str
+
+@dataclass
+class WithRef:
+    """The object of the enclosing With block (the implicit prefix of `.Foo`)."""
+    target: object
+
+@dataclass
+class Attr:
+    obj: object
+    name: str
+
+@dataclass
+class Call:
+    func: object
+    args: List[object]
+
+@dataclass
+class BinOp:
+    op: str
+    left: object
+    right: object
+
+@dataclass
+class UnaryOp:
+    op: str
+    operand: object
+
+# ---------------------------------------------------------------------------
+# Statement nodes
+# ---------------------------------------------------------------------------
+
+@dataclass
+class Declare:
+    name: str
+    vba_type: str = 'Variant'
+    bounds: Optional[list] = None
+
+@dataclass
+class Assign:
+    target: object
+    value: object
+    is_set: bool = False
+
+@dataclass
+class CallStmt:
+    call: object
+
+@dataclass
+class ForLoop:
+    var: str
+    start: object
+    end: object
+    step: object = None
+    body: list = field(default_factory=list)
+
+@dataclass
+class ForEach:
+    var: str
+    iterable: object
+    body: list = field(default_factory=list)
+
+@dataclass
+class WhileLoop:
+    condition: object
+    body: list = field(default_factory=list)
+    until: bool = False
+    test_after: bool = False
+
+@dataclass
+class If:
+    branches: list = field(default_factory=list)  # [(condition, body), ...]
+    orelse: list = field(default_factory=list)
+
+@dataclass
+class Exit:
+    kind: str  # 'Sub', 'Function', 'For' or 'Do'
+
+@dataclass
+class Raw:
+    """A VBA statement the IR builder does not understand; kept verbatim."""
+    text: str
+
+@dataclass
+class ProcedureIR:
+    name: str
+    kind: str
+    params: List[str]
+    return_type: str
+    body: list
+    locals: set = field(default_factory=set)
+
+@dataclass
+class ModuleIR:
+    procedures: List[ProcedureIR]
+    global_variables: set = field(default_factory=set)
+    declarations: list = field(default_factory=list)  # module-level Declare / Const Assign statements
+
+    def get(self, name):
+        for proc in self.procedures:
+            if proc.name.lower() == name.lower():
+                return proc
+        return None
+
+# ---------------------------------------------------------------------------
+# Tokenizer and expression parser
+# ---------------------------------------------------------------------------
+
+TOKEN_RE = re.compile(r'''
+    \s*(?:
+      (?P<str>"(?:[^"]|"")*")
+    | (?P<num>(?:\d+\.\d*|\.\d+|\d+)(?:[eE][-+]?\d+)?[#!@&%]?|&H[0-9A-Fa-f]+&?)
+    | (?P<name>[A-Za-z_][A-Za-z0-9_]*[$%&!#@]?)
+    | (?P<op><>|<=|>=|:=|[-+*/\\^&=<>(),.:])
+    )''', re.VERBOSE)
+
+KEYWORD_OPS = {'and', 'or', 'not', 'mod', 'xor', 'like', 'is'}
+
+# Lower number binds looser
+PRECEDENCE = [
+    ('or', 'xor'),
+    ('and',),
+    ('=', '<>', '<', '>', '<=', '>=', 'like', 'is'),
+    ('&',),
+    ('+', '-'),
+    ('mod',),
+    ('\\',),
+    ('*', '/'),
+]
+
+
+class ParseError(Exception):
+    pass
+
+
+def tokenize(text):
+    tokens = []
+    pos = 0
+    text = text.rstrip()
+    while pos < len(text):
+        match = TOKEN_RE.match(text, pos)
+        if not match or match.end() == pos:
+            raise ParseError(f"Unexpected character at {pos} in: {text}")
+        pos = match.end()
+        kind = match.lastgroup
+        value = match.group(kind)
+        if kind == 'name' and value.lower() in KEYWORD_OPS:
+            kind, value = 'op', value.lower()
+        tokens.append((kind, value))
+    return tokens
+
+
+class ExpressionParser:
+    def __init__(self, tokens, with_stack=None):
+        self.tokens = tokens
+        self.pos = 0
+        self.with_stack = with_stack or []
+
+    def peek(self, offset=0):
+        idx = self.pos + offset
+        return self.tokens[idx] if idx < len(self.tokens) else (None, None)
+
+    def at_end(self):
+        return self.pos >= len(self.tokens)
+
+    def next(self):
+        token = self.peek()
+        self.pos += 1
+        return token
+
+    def expect(self, value):
+        kind, tok = self.next()
+        if tok is None or tok.lower() != value:
+            raise ParseError(f"Expected {value!r}, found {tok!r}")
+
+    def accept(self, value):
+        if self.peek()[1] is not None and self.peek()[1].lower() == value:
+            self.pos += 1
+            return True
+        return False
+
+    def parse_expression(self, level=0):
+        if level == len(PRECEDENCE):
+            return self.parse_unary()
+        if PRECEDENCE[level] == ('=', '<>', '<', '>', '<=', '>=', 'like', 'is') and self.peek() == ('op', 'not'):
+            self.next()
+            return UnaryOp('not', self.parse_expression(level))
+        left = self.parse_expression(level + 1)
+        while self.peek()[0] == 'op' and self.peek()[1] in PRECEDENCE[level]:
+            op = self.next()[1]
+            right = self.parse_expression(level + 1)
+            left = BinOp(op, left, right)
+        return left
+
+    def parse_unary(self):
+        if self.accept('-'):
+            return UnaryOp('-', self.parse_unary())
+        if self.accept('+'):
+            return self.parse_unary()
+        base = self.parse_postfix()
+        if self.accept('^'):
+            return BinOp('^', base, self.parse_unary())
+        return base
+
+    def parse_postfix(self):
+        node = self.parse_primary()
+        while True:
+            if self.peek() == ('op', '('):
+                node = Call(node, self.parse_args())
+            elif self.peek() == ('op', '.') and self.peek(1)[0] == 'name':
+                self.next()
+                node = Attr(node, self.next()[1])
+            else:
+                return node
+
+    def parse_args(self):
+        self.expect('(')
+        args = []
+        if self.accept(')'):
+            return args
+        while True:
+            args.append(self.parse_argument())
+            if self.accept(')'):
+                return args
+            self.expect(',')
+
+    def parse_argument(self):
+        # Named arguments (Key:=value) keep only the value
+        if self.peek()[0] == 'name' and self.peek(1) == ('op', ':='):
+            self.pos += 2
+        return self.parse_expression()
+
+    def parse_primary(self):
+        kind, tok = self.next()
+        if kind == 'num':
+            return Num(parse_number(tok))
+        if kind == 'str':
+            return Str(tok[1:-1].replace('""', '"'))
+        if kind == 'name':
+            return Name(tok.rstrip('$%&!#@'))
+        if tok == '(':
+            expr = self.parse_expression()
+            self.expect(')')
+            return expr
+        if tok == '.' and self.peek()[0] == 'name':
+            if not self.with_stack:
+                raise ParseError("'.' member access outside a With block")
+            return Attr(WithRef(self.with_stack[-1]), self.next()[1])
+        raise ParseError(f"Unexpected token {tok!r}")
+
+
+def parse_number(tok):
+    if tok.upper().startswith('&H'):
+        return int(tok[2:].rstrip('&'), 16)
+    tok = tok.rstrip('#!@&%')
+    if re.fullmatch(r'\d+', tok):
+        return int(tok)
+    return float(tok)
+
+
+def parse_expression(text, with_stack=None):
+    parser = ExpressionParser(tokenize(text), with_stack)
+    expr = parser.parse_expression()
+    if not parser.at_end():
+        raise ParseError(f"Trailing tokens in expression: {text}")
+    return expr
+
+# ---------------------------------------------------------------------------
+# Statement parser
+# ---------------------------------------------------------------------------
+
+HEADER_RE = re.compile(r'^(?:(?:Public|Private|Friend|Static)\s+)*(Sub|Function)\s+(\w+)\s*\((.*?)\)\s*(?:As\s+(\w+))?', re.IGNORECASE)
+DECLARE_RE = re.compile(r'^(Dim|Static|ReDim(?:\s+Preserve)?)\s+(.*)$', re.IGNORECASE)
+CONST_RE = re.compile(r'^(?:(?:Public|Private)\s+)?Const\s+(\w+)[$%&!#@]?(?:\s+As\s+\w+)?\s*=\s*(.+)$', re.IGNORECASE)
+FOR_EACH_RE = re.compile(r'^For\s+Each\s+(\w+)\s+In\s+(.+)$', re.IGNORECASE)
+FOR_RE = re.compile(r'^For\s+(\w+)\s*=\s*(.+?)\s+To\s+(.+?)(?:\s+Step\s+(.+))?$', re.IGNORECASE)
+IF_RE = re.compile(r'^(?:Else)?If\s+(.+?)\s+Then\b(.*)$', re.IGNORECASE)
+DO_RE = re.compile(r'^Do(?:\s+(While|Until)\s+(.+))?$', re.IGNORECASE)
+LOOP_RE = re.compile(r'^Loop(?:\s+(While|Until)\s+(.+))?$', re.IGNORECASE)
+WHILE_RE = re.compile(r'^While\s+(.+)$', re.IGNORECASE)
+WITH_RE = re.compile(r'^With\s+(.+)$', re.IGNORECASE)
+EXIT_RE = re.compile(r'^Exit\s+(Sub|Function|For|Do)$', re.IGNORECASE)
+SELECT_RE = re.compile(r'^Select\s+Case\s+(.+)$', re.IGNORECASE)
+CASE_RE = re.compile(r'^Case\s+(.+)$', re.IGNORECASE)
+LABEL_RE = re.compile(r'^\w+:$')
+CASE_IS_RE = re.compile(r'^(?:Is\s*)?(<>|<=|>=|=|<|>)\s*(.+)$', re.IGNORECASE)
+
+
+def strip_comment(line):
+    in_string = False
+    for idx, ch in enumerate(line):
+        if ch == '"':
+            in_string = not in_string
+        elif ch == "'" and not in_string:
+            return line[:idx].rstrip()
+    if re.match(r'^Rem\b', line.strip(), re.IGNORECASE):
+        return ''
+    return line.rstrip()
+
+
+def logical_lines(code):
+    """Join `_` line continuations, split `a: b` statement lists and drop comments and blank lines."""
+    lines = []
+    pending = ''
+    for raw in code.replace('\r\n', '\n').split('\n'):
+        line = strip_comment(raw)
+        if line.endswith(' _'):
+            pending += line[:-2] + ' '
+            continue
+        line = (pending + line).strip()
+        pending = ''
+        match = IF_RE.match(line)
+        if match and match.group(2).strip():
+            # Every statement after a single-line Then belongs to the If
+            lines.append(line)
+            continue
+        lines.extend(statement for statement in split_statements(line) if statement)
+    return lines
+
+
+def split_statements(line):
+    """Split a line on the `:` statement separator, leaving strings, `:=` and line labels alone."""
+    if LABEL_RE.match(line):
+        return [line]
+    statements = []
+    in_string = False
+    start = 0
+    for idx, ch in enumerate(line):
+        if ch == '"':
+            in_string = not in_string
+        elif ch == ':' and not in_string and line[idx + 1:idx + 2] != '=':
+            statements.append(line[start:idx].strip())
+            start = idx + 1
+    statements.append(line[start:].strip())
+    return statements
+
+
+def parse_params(args):
+    params = []
+    for arg in args.split(','):
+        words = [w for w in arg.split() if w.lower() not in ('byval', 'byref', 'optional', 'paramarray')]
+        if words:
+            params.append(words[0].rstrip('()$%&!#@'))
+    return params
+
+
+def parse_declarations(text):
+    declarations = []
+    for part in split_top_level(text, ','):
+        match = re.match(r'^\s*(\w+)[$%&!#@]?\s*(?:\((.*?)\))?\s*(?:As\s+(?:New\s+)?([\w.]+))?', part, re.IGNORECASE)
+        if not match:
+            continue
+        if part[match.end():].strip():
+            raise ParseError(f"Unexpected text after declaration: {part}")
+        bounds = None
+        if match.group(2) is not None:
+            bounds = [parse_expression(b) for b in re.split(r'\s+To\s+', match.group(2), flags=re.IGNORECASE) if b.strip()]
+        declarations.append(Declare(match.group(1), match.group(3) or 'Variant', bounds))
+    return declarations
+
+
+def split_top_level(text, sep):
+    parts = []
+    depth = 0
+    in_string = False
+    current = ''
+    for ch in text:
+        if ch == '"':
+            in_string = not in_string
+        elif not in_string and ch == '(':
+            depth += 1
+        elif not in_string and ch == ')':
+            depth -= 1
+        if ch == sep and depth == 0 and not in_string:
+            parts.append(current)
+            current = ''
+        else:
+            current += ch
+    parts.append(current)
+    return parts
+
+
+class StatementParser:
+    def __init__(self, lines):
+        self.lines = lines
+        self.pos = 0
+        self.with_stack = []
+
+    def parse_block(self, terminators):
+        """Parse statements until a line matching one of the terminator regexes; return (body, line)."""
+        body = []
+        while self.pos < len(self.lines):
+            line = self.lines[self.pos]
+            for terminator in terminators:
+                if re.match(terminator, line, re.IGNORECASE):
+                    self.pos += 1
+                    return body, line
+            self.pos += 1
+            body.extend(self.parse_statement(line))
+        return body, None
+
+    def expr(self, text):
+        return parse_expression(text, self.with_stack)
+
+    def parse_statements(self, text):
+        """Parse the `:`-separated statements of a single-line If branch."""
+        body = []
+        for statement in split_statements(text.strip()):
+            if statement:
+                body.extend(self.parse_statement(statement))
+        return body
+
+    def parse_statement(self, line):
+        try:
+            return self._parse_statement(line)
+        except ParseError as e:
+            logger.debug(f"Keeping raw VBA line {line!r}: {e}")
+            return [Raw(line)]
+
+    def _parse_statement(self, line):
+        match = DECLARE_RE.match(line)
+        if match:
+            return parse_declarations(match.group(2))
+
+        match = CONST_RE.match(line)
+        if match:
+            return [Assign(Name(match.group(1)), self.expr(match.group(2)))]
+
+        match = FOR_EACH_RE.match(line)
+        if match:
+            body, _ = self.parse_block([r'^Next\b'])
+            return [ForEach(match.group(1), self.expr(match.group(2)), body)]
+
+        match = FOR_RE.match(line)
+        if match:
+            step = self.expr(match.group(4)) if match.group(4) else None
+            start, end = self.expr(match.group(2)), self.expr(match.group(3))
+            body, _ = self.parse_block([r'^Next\b'])
+            return [ForLoop(match.group(1), start, end, step, body)]
+
+        match = IF_RE.match(line)
+        if match and not line.lower().startswith('elseif'):
+            return [self.parse_if(match)]
+
+        match = DO_RE.match(line)
+        if match:
+            body, end_line = self.parse_block([r'^Loop\b'])
+            if match.group(1):
+                return [WhileLoop(self.expr(match.group(2)), body, until=match.group(1).lower() == 'until')]
+            end_match = LOOP_RE.match(end_line or '')
+            if end_match and end_match.group(1):
+                return [WhileLoop(self.expr(end_match.group(2)), body, until=end_match.group(1).lower() == 'until', test_after=True)]
+            return [WhileLoop(Name('True'), body)]
+
+        match = WHILE_RE.match(line)
+        if match:
+            body, _ = self.parse_block([r'^Wend\b'])
+            return [WhileLoop(self.expr(match.group(1)), body)]
+
+        match = WITH_RE.match(line)
+        if match:
+            self.with_stack.append(self.expr(match.group(1)))
+            try:
+                body, _ = self.parse_block([r'^End\s+With\b'])
+            finally:
+                self.with_stack.pop()
+            return body
+
+        match = EXIT_RE.match(line)
+        if match:
+            return [Exit(match.group(1).capitalize())]
+
+        match = SELECT_RE.match(line)
+        if match:
+            return self.parse_select(match)
+
+        return [self.parse_simple(line)]
+
+    def parse_if(self, match):
+        condition = self.expr(match.group(1))
+        rest = match.group(2).strip()
+        if rest:
+            # Single-line form: If c Then a [Else b]
+            then_part, _, else_part = rest.partition(' Else ')
+            return If([(condition, self.parse_statements(then_part))], self.parse_statements(else_part))
+
+        terminators = [r'^ElseIf\b', r'^Else\b', r'^End\s+If\b']
+        node = If()
+        body, end_line = self.parse_block(terminators)
+        node.branches.append((condition, body))
+        while end_line is not None and end_line.lower().startswith('elseif'):
+            elif_match = IF_RE.match(end_line)
+            elif_condition = self.expr(elif_match.group(1))
+            # Statements can follow Then on the ElseIf line itself
+            body = self.parse_statements(elif_match.group(2))
+            more, end_line = self.parse_block(terminators)
+            node.branches.append((elif_condition, body + more))
+        if end_line is not None and re.match(r'^Else\b', end_line, re.IGNORECASE):
+            node.orelse = self.parse_statements(end_line[4:])
+            more, _ = self.parse_block([r'^End\s+If\b'])
+            node.orelse.extend(more)
+        return node
+
+    def parse_select(self, match):
+        """Select Case becomes an If/ElseIf chain comparing the subject with each Case list."""
+        subject = self.expr(match.group(1))
+        terminators = [r'^Case\b', r'^End\s+Select\b']
+        # Anything between Select Case and the first Case never runs
+        _, end_line = self.parse_block(terminators)
+        node = If()
+        while end_line is not None and CASE_RE.match(end_line):
+            case = CASE_RE.match(end_line).group(1).strip()
+            body, end_line = self.parse_block(terminators)
+            if case.lower() == 'else':
+                node.orelse = body
+            else:
+                node.branches.append((self.case_condition(subject, case), body))
+        if not node.branches:
+            return node.orelse
+        return [node]
+
+    def case_condition(self, subject, case):
+        condition = None
+        for item in split_top_level(case, ','):
+            item = item.strip()
+            bounds = re.split(r'\s+To\s+', item, maxsplit=1, flags=re.IGNORECASE)
+            comparison = CASE_IS_RE.match(item)
+            if comparison:
+                test = BinOp(comparison.group(1), subject, self.expr(comparison.group(2)))
+            elif len(bounds) == 2:
+                test = BinOp('and', BinOp('>=', subject, self.expr(bounds[0])), BinOp('<=', subject, self.expr(bounds[1])))
+            else:
+                test = BinOp('=', subject, self.expr(item))
+            condition = test if condition is None else BinOp('or', condition, test)
+        return condition
+
+    def parse_simple(self, line):
+        is_set = False
+        text = line
+        keyword = re.match(r'^(Set|Let|Call)\s+', text, re.IGNORECASE)
+        if keyword:
+            is_set = keyword.group(1).lower() == 'set'
+            text = text[keyword.end():]
+
+        parser = ExpressionParser(tokenize(text), self.with_stack)
+        target = parser.parse_postfix()
+        if parser.accept('='):
+            value = parser.parse_expression()
+            if not parser.at_end():
+                raise ParseError(f"Trailing tokens in assignment: {line}")
+            return Assign(target, value, is_set)
+        if parser.at_end():
+            return CallStmt(target if isinstance(target, Call) else Call(target, []))
+        # Call without parentheses: MsgBox "x", vbOKOnly
+        args = [parser.parse_argument()]
+        while parser.accept(','):
+            args.append(parser.parse_argument())
+        if not parser.at_end():
+            raise ParseError(f"Trailing tokens in call: {line}")
+        return CallStmt(Call(target, args))
+
+
+def build_procedure_ir(macro):
+    """Build the IR for one procedure dict produced by MacroParser.analyze_procedure."""
+    lines = logical_lines(macro['code'])
+    header = HEADER_RE.match(lines[0]) if lines else None
+    params = parse_params(header.group(3)) if header else parse_params(macro.get('arguments', ''))
+    parser = StatementParser(lines[1:] if header else lines)
+    body, _ = parser.parse_block([r'^End\s+(Sub|Function)\b'])
+    return ProcedureIR(
+        name=macro['name'],
+        kind=macro['type'],
+        params=params,
+        return_type=macro.get('return_type') or '',
+        body=body,
+        locals=set(macro.get('local_variables', ())),
+    )
+
+
+def build_module_ir(parsed_macros, global_variables=(), declarations=()):
+    """Build the IR once for all parsed procedures; translators and analyzers share it.
+
+    declarations are module-level `Public x As T` / `Public Const X = v` lines.
+    """
+    lines = [re.sub(r'^(?:Public|Global)\s+(?!Const\b)', 'Dim ', line, flags=re.IGNORECASE)
+             for line in logical_lines('\n'.join(declarations))]
+    statements, _ = StatementParser(lines).parse_block([])
+    return ModuleIR(
+        [build_procedure_ir(macro) for macro in parsed_macros],
+        set(global_variables),
+        [stmt for stmt in statements if isinstance(stmt, (Declare, Assign))],
+    )
+
+
+def walk(nodes):
+    """Yield every statement in nodes, depth first."""
+    for node in nodes:
+        yield node
+        if isinstance(node, (ForLoop, ForEach, WhileLoop)):
+            yield from walk(node.body)
+        elif isinstance(node, If):
+            for _, body in node.branches:
+                yield from walk(body)
+            yield from walk(node.orelse)
+
+
+def statement_expressions(stmt):
+    """Expressions a statement evaluates itself (not those of nested bodies)."""
+    if isinstance(stmt, Assign):
+        return [stmt.target, stmt.value]
+    if isinstance(stmt, CallStmt):
+        return [stmt.call]
+    if isinstance(stmt, ForLoop):
+        return [e for e in (stmt.start, stmt.end, stmt.step) if e is not None]
+    if isinstance(stmt, ForEach):
+        return [stmt.iterable]
+    if isinstance(stmt, WhileLoop):
+        return [stmt.condition]
+    if isinstance(stmt, If):
+        return [condition for condition, _ in stmt.branches]
+    return []
+
+
+def walk_expr(expr, into_with=True):
+    """Yield every expression node under expr, including expr itself.
+
+    With into_with=False the target of a With block is not visited: it was
+    evaluated once by the With statement, not by this expression.
+    """
+    yield expr
+    if isinstance(expr, Attr):
+        yield from walk_expr(expr.obj, into_with)
+    elif isinstance(expr, WithRef):
+        if into_with:
+            yield from walk_expr(expr.target, into_with)
+    elif isinstance(expr, Call):
+        yield from walk_expr(expr.func, into_with)
+        for arg in expr.args:
+            yield from walk_expr(arg, into_with)
+    elif isinstance(expr, BinOp):
+        yield from walk_expr(expr.left, into_with)
+        yield from walk_expr(expr.right, into_with)
+    elif isinstance(expr, UnaryOp):
+        yield from walk_expr(expr.operand, into_with)
+
+
+def is_name(expr, *names):
+    return isinstance(expr, Name) and expr.name.lower() in names
+
+
+def unwrap_with(expr):
+    return expr.target if isinstance(expr, WithRef) else expr
+
+
+def strip_value(expr):
+    if isinstance(expr, Attr) and expr.name.lower() in ('value', 'value2'):
+        return expr.obj
+    return expr
+
+
+def cell_ref(expr):
+    """Return (sheet, row, column) for Cells(r, c) / sheet.Cells(r, c)[.Value], else None."""
+    expr = strip_value(expr)
+    if not (isinstance(expr, Call) and len(expr.args) == 2):
+        return None
+    func = expr.func
+    if is_name(func, 'cells'):
+        return None, expr.args[0], expr.args[1]
+    if isinstance(func, Attr) and func.name.lower() == 'cells':
+        return unwrap_with(func.obj), expr.args[0], expr.args[1]
+    return None
+
+
+def range_ref(expr):
+    """Return (sheet, address) for Range(addr) / sheet.Range(addr)[.Value], else None."""
+    expr = strip_value(expr)
+    if not (isinstance(expr, Call) and len(expr.args) == 1):
+        return None
+    func = expr.func
+    if is_name(func, 'range'):
+        return None, expr.args[0]
+    if isinstance(func, Attr) and func.name.lower() == 'range':
+        return unwrap_with(func.obj), expr.args[0]
+    return None
+
+
+def is_worksheets(expr):
+    """True for the Worksheets/Sheets collection, optionally qualified by ThisWorkbook/ActiveWorkbook."""
+    expr = unwrap_with(expr)
+    if is_name(expr, 'worksheets', 'sheets'):
+        return True
+    return isinstance(expr, Attr) and expr.name.lower() in ('worksheets', 'sheets') and is_name(unwrap_with(expr.obj), 'thisworkbook', 'activeworkbook')
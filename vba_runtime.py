@@ -0,0 +1,153 @@
+"""Helpers imported by Python code generated from VBA macros."""
+import math
+
+import pandas as pd
+from openpyxl.styles import Font, PatternFill
+from openpyxl.utils import get_column_letter
+
+
+def vba_range(start, end, step=1):
+    """Inclusive range matching VBA `For i = start To end Step step`."""
+    start, end, step = int(start), int(end), int(step)
+    return range(start, end + (1 if step > 0 else -1), step)
+
+
+def vba_str(value):
+    if isinstance(value, pd.Series):
+        # A column read by read_columns: convert element-wise, missing cells are Empty
+        return value.astype(object).where(value.notna(), None).map(vba_str)
+    if value is None:
+        return ''
+    if isinstance(value, bool):
+        return 'True' if value else 'False'
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value)
+
+
+def vba_num(value):
+    """Empty (None) counts as 0 in VBA arithmetic and numeric comparisons."""
+    if isinstance(value, pd.Series):
+        return value.fillna(0)
+    return 0 if value is None else value
+
+
+def vba_int(value):
+    return math.floor(value)
+
+
+def vba_mid(text, start, length=None):
+    text = vba_str(text)
+    start = int(start) - 1
+    return text[start:] if length is None else text[start:start + int(length)]
+
+
+def vba_left(text, length):
+    return vba_str(text)[:int(length)]
+
+
+def vba_right(text, length):
+    length = int(length)
+    return vba_str(text)[-length:] if length else ''
+
+
+def rgb(red, green, blue):
+    """VBA RGB() packs colours as 0xBBGGRR; openpyxl wants an RRGGBB string."""
+    return f"{int(red):02X}{int(green):02X}{int(blue):02X}"
+
+
+def color_to_hex(color):
+    if isinstance(color, str):
+        return color
+    color = int(color)
+    return f"{color & 0xFF:02X}{(color >> 8) & 0xFF:02X}{(color >> 16) & 0xFF:02X}"
+
+
+def set_fill(cells, color):
+    for cell in iter_cells(cells):
+        cell.fill = PatternFill(fill_type='solid', fgColor=color_to_hex(color))
+
+
+def set_bold(cells, bold=True):
+    for cell in iter_cells(cells):
+        cell.font = Font(bold=bool(bold))
+
+
+def iter_cells(cells):
+    """Flatten a cell, a row of cells or a 2-D range into individual cells."""
+    if hasattr(cells, 'value') and not isinstance(cells, (tuple, list)):
+        yield cells
+        return
+    for item in cells:
+        if isinstance(item, (tuple, list)):
+            yield from item
+        else:
+            yield item
+
+
+def autofit_columns(ws):
+    for column_cells in ws.columns:
+        width = max((len(vba_str(cell.value)) for cell in column_cells), default=0)
+        ws.column_dimensions[get_column_letter(column_cells[0].column)].width = width + 2
+
+
+def last_row(ws, column=1):
+    """Equivalent of Cells(Rows.Count, column).End(xlUp).Row."""
+    for row in range(ws.max_row, 0, -1):
+        if ws.cell(row=row, column=column).value is not None:
+            return row
+    return 1
+
+
+def read_columns(ws, first_row, last_row, columns):
+    """Read a block of whole columns into a DataFrame indexed by row number.
+
+    Frame columns are the sheet column numbers, so `frame[3]` is column C.
+    Empty cells stay missing (NA/None) so copying a cell keeps it empty;
+    vba_num() turns them into 0 where they are used in arithmetic. Columns
+    of whole numbers use the nullable Int64 dtype so they stay integers.
+    """
+    first_row, last_row = int(first_row), int(last_row)
+    index = pd.RangeIndex(first_row, max(first_row, last_row + 1))
+    data = {}
+    if columns and len(index):
+        min_col, max_col = min(columns), max(columns)
+        rows = list(ws.iter_rows(min_row=first_row, max_row=last_row, min_col=min_col, max_col=max_col, values_only=True))
+        for column in columns:
+            data[column] = column_series([row[column - min_col] for row in rows], index)
+    else:
+        data = {column: pd.Series([], index=index, dtype=object) for column in columns}
+    return pd.DataFrame(data, index=index)
+
+
+def column_series(values, index):
+    present = [value for value in values if value is not None]
+    if all(isinstance(value, int) and not isinstance(value, bool) for value in present):
+        return pd.Series(values, index=index, dtype='Int64')
+    if all(isinstance(value, (int, float)) and not isinstance(value, bool) for value in present):
+        return pd.Series(values, index=index, dtype='float64')
+    return pd.Series(values, index=index, dtype=object)
+
+
+def row_series(frame):
+    return pd.Series(frame.index, index=frame.index)
+
+
+def write_columns(ws, frame, first_row, columns):
+    """Write the given frame columns back to the sheet starting at first_row."""
+    first_row = int(first_row)
+    for column in columns:
+        values = frame[column]
+        if not isinstance(values, pd.Series):
+            values = pd.Series(values, index=frame.index)
+        for row, value in enumerate(values.tolist(), start=first_row):
+            if value is pd.NA or (isinstance(value, float) and math.isnan(value)):
+                value = None
+            ws.cell(row=row, column=column, value=value)
+
+
+def get_sheet(wb, key):
+    """Worksheets(key): by name, or by 1-based position when key is a number."""
+    if isinstance(key, (int, float)):
+        return wb.worksheets[int(key) - 1]
+    return wb[key]
@@ -0,0 +1,580 @@
+import keyword
+import logging
+
+from vba_ir import (
+    Num, Str, Name, WithRef, Attr, Call, BinOp, UnaryOp,
+    Declare, Assign, CallStmt, ForLoop, ForEach, WhileLoop, If, Exit, Raw,
+    walk, walk_expr, is_name, unwrap_with, strip_value, cell_ref, range_ref, is_worksheets,
+)
+
+logger = logging.getLogger(__name__)
+
+# Names the generated code uses itself; VBA identifiers that clash get a trailing underscore
+RESERVED_NAMES = {
+    'wb', 'active_sheet', 'print', 'range', 'len', 'str', 'int', 'float', 'round', 'abs',
+    'max', 'min', 'sum', 'list', 'type', 'id', 'input', 'object',
+}
+
+CONSTANTS = {
+    'true': 'True', 'false': 'False', 'nothing': 'None', 'empty': 'None', 'null': 'None',
+    'vbcrlf': "'\\r\\n'", 'vbnewline': "'\\n'", 'vblf': "'\\n'", 'vbcr': "'\\r'",
+    'vbtab': "'\\t'", 'vbnullstring': "''",
+    'activesheet': 'active_sheet', 'activeworkbook': 'wb', 'thisworkbook': 'wb',
+    'vbred': '255', 'vbgreen': '65280', 'vbblue': '16711680', 'vbyellow': '65535',
+    'vbwhite': '16777215', 'vbblack': '0',
+}
+
+FUNCTIONS = {
+    'len': 'len({})', 'ucase': 'vba_str({}).upper()', 'lcase': 'vba_str({}).lower()',
+    'trim': 'vba_str({}).strip()', 'ltrim': 'vba_str({}).lstrip()', 'rtrim': 'vba_str({}).rstrip()',
+    'cstr': 'vba_str({})', 'cint': 'round({})', 'clng': 'round({})', 'cdbl': 'float({})',
+    'csng': 'float({})', 'cbool': 'bool({})', 'abs': 'abs({})', 'int': 'vba_int({})',
+    'fix': 'int({})', 'sqr': 'math.sqrt({})', 'isempty': '({} is None)',
+    'isnumeric': 'isinstance({}, (int, float))', 'round': 'round({})',
+    'left': 'vba_left({})', 'right': 'vba_right({})', 'mid': 'vba_mid({})', 'rgb': 'rgb({})',
+}
+
+DEFAULTS = {
+    'integer': '0', 'long': '0', 'longlong': '0', 'byte': '0', 'single': '0.0', 'double': '0.0',
+    'currency': '0.0', 'string': "''", 'boolean': 'False',
+}
+
+BINARY_OPS = {
+    '+': '+', '-': '-', '*': '*', '/': '/', '\\': '//', 'mod': '%', '^': '**',
+    '=': '==', '<>': '!=', '<': '<', '>': '>', '<=': '<=', '>=': '>=',
+    'and': 'and', 'or': 'or', 'is': 'is',
+}
+
+# Element-wise operators that are safe on pandas Series
+VECTOR_OPS = {op: BINARY_OPS[op] for op in ('+', '-', '*', '/', '\\', 'mod', '^', '=', '<>', '<', '>', '<=', '>=')}
+
+CELL_ATTRS = {'value': 'value', 'value2': 'value', 'text': 'value', 'formula': 'value', 'row': 'row', 'column': 'column'}
+
+
+class Unsupported(Exception):
+    pass
+
+
+class NotVectorizable(Exception):
+    pass
+
+
+def ident(name):
+    if keyword.iskeyword(name) or name.lower() in RESERVED_NAMES or name.startswith('_'):
+        return f"{name}_"
+    return name
+
+
+def format_vba(expr):
+    """Render an IR expression back to (approximate) VBA for comments."""
+    if isinstance(expr, Num):
+        return str(expr.value)
+    if isinstance(expr, Str):
+        return '"' + expr.value.replace('"', '""') + '"'
+    if isinstance(expr, Name):
+        return expr.name
+    if isinstance(expr, WithRef):
+        return ''
+    if isinstance(expr, Attr):
+        return f"{format_vba(expr.obj)}.{expr.name}"
+    if isinstance(expr, Call):
+        return f"{format_vba(expr.func)}({', '.join(format_vba(a) for a in expr.args)})"
+    if isinstance(expr, BinOp):
+        return f"{format_vba(expr.left)} {expr.op} {format_vba(expr.right)}"
+    if isinstance(expr, UnaryOp):
+        return f"{expr.op} {format_vba(expr.operand)}" if expr.op == 'not' else f"-{format_vba(expr.operand)}"
+    return '?'
+
+
+def format_statement(stmt):
+    if isinstance(stmt, Raw):
+        return stmt.text
+    if isinstance(stmt, Assign):
+        return f"{'Set ' if stmt.is_set else ''}{format_vba(stmt.target)} = {format_vba(stmt.value)}"
+    if isinstance(stmt, CallStmt):
+        return format_vba(stmt.call)
+    return type(stmt).__name__
+
+
+class PythonTranslator:
+    """Lower a ModuleIR to a Python module that works on an openpyxl workbook.
+
+    Every Sub/Function becomes `def name(wb, *params)`. With vectorize=True,
+    `For` loops whose body only does same-row cell arithmetic are lowered to
+    whole-column pandas operations.
+    """
+
+    def __init__(self, module_ir, vectorize=True):
+        self.module = module_ir
+        self.vectorize = vectorize
+        self.procedure_names = {proc.name.lower(): proc.name for proc in module_ir.procedures}
+        self.proc = None
+        self.arrays = set()
+        self.cell_vars = set()
+        self.vectorized_loops = []
+
+    # -- module / procedure -------------------------------------------------
+
+    def translate(self):
+        lines = [
+            '"""Python translation of VBA macros (generated)."""',
+            'import math',
+            '',
+            'from vba_runtime import (',
+            '    vba_range, vba_str, vba_num, vba_int, vba_mid, vba_left, vba_right, rgb, set_fill, set_bold,',
+            '    iter_cells, autofit_columns, last_row, read_columns, row_series, write_columns, get_sheet,',
+            ')',
+            '',
+        ]
+        declarations = {}
+        for stmt in self.module.declarations:
+            name = stmt.name if isinstance(stmt, Declare) else stmt.target.name
+            declarations[name.lower()] = stmt
+        for var in sorted(self.module.global_variables):
+            stmt = declarations.get(var.lower())
+            try:
+                if isinstance(stmt, Declare) and stmt.bounds:
+                    lines.append(f"{ident(var)} = [None] * (int({self.expr(stmt.bounds[-1])}) + 1)")
+                elif isinstance(stmt, Declare):
+                    lines.append(f"{ident(var)} = {DEFAULTS.get(stmt.vba_type.lower(), 'None')}")
+                elif isinstance(stmt, Assign):
+                    lines.append(f"{ident(var)} = {self.expr(stmt.value)}")
+                else:
+                    lines.append(f"{ident(var)} = None")
+            except Unsupported as e:
+                lines.append(f"{ident(var)} = None  # TODO: untranslated VBA ({e}): {format_statement(stmt)}")
+        for proc in self.module.procedures:
+            lines.append('')
+            lines.append('')
+            lines.extend(self.translate_procedure(proc))
+        return '\n'.join(lines) + '\n'
+
+    def translate_procedure(self, proc):
+        self.proc = proc
+        self.arrays = {stmt.name.lower() for stmt in walk(proc.body) if isinstance(stmt, Declare) and stmt.bounds is not None}
+        # Variables holding a cell or range object: `cell = x` and `cell` in an expression mean its value
+        self.cell_vars = set()
+        for stmt in walk(proc.body):
+            if isinstance(stmt, ForEach) and (range_ref(stmt.iterable) or cell_ref(stmt.iterable)):
+                self.cell_vars.add(stmt.var.lower())
+            elif isinstance(stmt, Assign) and stmt.is_set and isinstance(stmt.target, Name) and (range_ref(stmt.value) or cell_ref(stmt.value)):
+                self.cell_vars.add(stmt.target.name.lower())
+        params = ', '.join(['wb'] + [ident(p) for p in proc.params])
+        lines = [f"def {ident(proc.name)}({params}):"]
+        body = ['active_sheet = wb.active']
+
+        assigned = {stmt.target.name.lower() for stmt in walk(proc.body)
+                    if isinstance(stmt, Assign) and isinstance(stmt.target, Name)}
+        declared = {stmt.name.lower() for stmt in walk(proc.body) if isinstance(stmt, Declare)}
+        globals_written = sorted(var for var in self.module.global_variables
+                                 if var.lower() in assigned and var.lower() not in declared)
+        if globals_written:
+            body.insert(0, f"global {', '.join(ident(v) for v in globals_written)}")
+        if proc.kind == 'Function':
+            body.append('_result = None')
+
+        body.extend(self.block(proc.body))
+        if proc.kind == 'Function':
+            body.append('return _result')
+        lines.extend(indent(body))
+        return lines
+
+    def block(self, statements):
+        lines = []
+        for stmt in statements:
+            try:
+                lines.extend(self.statement(stmt))
+            except Unsupported as e:
+                lines.append(f"# TODO: untranslated VBA ({e}): {format_statement(stmt)}")
+        if not any(line.strip() and not line.lstrip().startswith('#') for line in lines):
+            lines.append('pass')
+        return lines
+
+    # -- statements ---------------------------------------------------------
+
+    def statement(self, stmt):
+        if isinstance(stmt, Declare):
+            return self.declare(stmt)
+        if isinstance(stmt, Assign):
+            return self.assign(stmt)
+        if isinstance(stmt, CallStmt):
+            return self.call_statement(stmt.call)
+        if isinstance(stmt, ForLoop):
+            return self.for_loop(stmt)
+        if isinstance(stmt, ForEach):
+            iterable = self.object_ref(stmt.iterable)
+            if range_ref(stmt.iterable) or cell_ref(stmt.iterable):
+                iterable = f"iter_cells({iterable})"
+            return [f"for {ident(stmt.var)} in {iterable}:"] + indent(self.block(stmt.body))
+        if isinstance(stmt, WhileLoop):
+            return self.while_loop(stmt)
+        if isinstance(stmt, If):
+            lines = []
+            for idx, (condition, body) in enumerate(stmt.branches):
+                keyword_ = 'if' if idx == 0 else 'elif'
+                lines.append(f"{keyword_} {self.expr(condition)}:")
+                lines.extend(indent(self.block(body)))
+            if stmt.orelse:
+                lines.append('else:')
+                lines.extend(indent(self.block(stmt.orelse)))
+            return lines
+        if isinstance(stmt, Exit):
+            if stmt.kind in ('Sub', 'Function'):
+                return ['return _result' if self.proc.kind == 'Function' else 'return']
+            return ['break']
+        if isinstance(stmt, Raw):
+            raise Unsupported('not parsed')
+        raise Unsupported(type(stmt).__name__)
+
+    def declare(self, stmt):
+        if stmt.name in self.proc.params:
+            return []
+        if stmt.bounds:
+            return [f"{ident(stmt.name)} = [None] * (int({self.expr(stmt.bounds[-1])}) + 1)"]
+        return [f"{ident(stmt.name)} = {DEFAULTS.get(stmt.vba_type.lower(), 'None')}"]
+
+    def assign(self, stmt):
+        target, value = stmt.target, stmt.value
+        if isinstance(target, Attr) and isinstance(target.obj, Attr):
+            inner = target.obj
+            if inner.name.lower() == 'interior' and target.name.lower() == 'color':
+                return [f"set_fill({self.object_ref(inner.obj)}, {self.expr(value)})"]
+            if inner.name.lower() == 'font' and target.name.lower() == 'bold':
+                return [f"set_bold({self.object_ref(inner.obj)}, {self.expr(value)})"]
+        if isinstance(target, Attr) and is_name(unwrap_with(target.obj), 'application'):
+            return [f"# Application.{target.name} has no openpyxl equivalent"]
+        if isinstance(target, Attr) and target.name.lower() == 'name' and not cell_ref(target.obj):
+            return [f"{self.object_ref(target.obj)}.title = {self.expr(value)}"]
+        if cell_ref(target) or range_ref(target):
+            return [f"{self.object_ref(strip_value(target))}.value = {self.expr(value)}"]
+        if self.is_cell_var(target) or (isinstance(target, Name) and target.name.lower() in self.cell_vars and not stmt.is_set):
+            return [f"{ident(strip_value(target).name)}.value = {self.expr(value)}"]
+        if stmt.is_set and isinstance(target, Name) and (range_ref(value) or cell_ref(value)):
+            return [f"{self.name_target(target.name)} = {self.object_ref(value)}"]
+        if isinstance(target, Name):
+            return [f"{self.name_target(target.name)} = {self.expr(value)}"]
+        if isinstance(target, Call) and isinstance(target.func, Name) and target.func.name.lower() in self.arrays:
+            index = ']['.join(self.expr(a) for a in target.args)
+            return [f"{ident(target.func.name)}[{index}] = {self.expr(value)}"]
+        raise Unsupported('assignment target')
+
+    def name_target(self, name):
+        if self.proc.kind == 'Function' and name.lower() == self.proc.name.lower():
+            return '_result'
+        return ident(name)
+
+    def call_statement(self, call):
+        func = call.func
+        args = [self.expr(a) for a in call.args]
+        if is_name(func, 'msgbox') or (isinstance(func, Attr) and is_name(func.obj, 'debug') and func.name.lower() == 'print'):
+            return [f"print({args[0] if args else ''})"]
+        if isinstance(func, Name) and func.name.lower() in self.procedure_names:
+            return [f"{ident(self.procedure_names[func.name.lower()])}({', '.join(['wb'] + args)})"]
+        if isinstance(func, Attr):
+            method = func.name.lower()
+            if method == 'autofit':
+                return [f"autofit_columns({self.base_sheet(func.obj)})"]
+            if method == 'add' and is_worksheets(func.obj):
+                return ['wb.create_sheet()']
+            if method == 'activate' and self.is_sheet(func.obj):
+                return [f"wb.active = {self.object_ref(func.obj)}"]
+            if method in ('select', 'activate'):
+                return [f"# {format_vba(func)} only moves the Excel selection"]
+            if method in ('clearcontents', 'clear'):
+                return [f"for _cell in iter_cells({self.object_ref(func.obj)}):", '    _cell.value = None']
+        raise Unsupported('call')
+
+    def for_loop(self, loop):
+        if self.vectorize:
+            try:
+                return self.vectorized_for(loop)
+            except NotVectorizable as e:
+                logger.debug(f"Loop over {loop.var} in {self.proc.name} kept scalar: {e}")
+        bounds = [self.expr(loop.start), self.expr(loop.end)]
+        if loop.step is not None:
+            bounds.append(self.expr(loop.step))
+        return [f"for {ident(loop.var)} in vba_range({', '.join(bounds)}):"] + indent(self.block(loop.body))
+
+    def while_loop(self, loop):
+        condition = self.expr(loop.condition)
+        if loop.test_after:
+            exit_test = condition if loop.until else f"not ({condition})"
+            return ['while True:'] + indent(self.block(loop.body) + [f"if {exit_test}:", '    break'])
+        if loop.until:
+            condition = f"not ({condition})"
+        return [f"while {condition}:"] + indent(self.block(loop.body))
+
+    # -- vectorization ------------------------------------------------------
+
+    def vectorized_for(self, loop):
+        """Lower a For loop to column operations when dependence analysis allows it.
+
+        Allowed bodies are plain assignments where every cell access is
+        Cells(<loop var>, <constant column>) on one sheet, plus scalar sum
+        reductions (s = s + expr). Same-row reads after writes keep statement
+        order, so they stay correct; anything that could carry a value from
+        one row to the next (other row offsets, branches, calls, variables
+        assigned inside the loop) keeps the scalar loop.
+        """
+        if loop.step is not None and not (isinstance(loop.step, Num) and loop.step.value == 1):
+            raise NotVectorizable('step is not 1')
+        if not loop.body or not all(isinstance(s, Assign) and not s.is_set for s in loop.body):
+            raise NotVectorizable('body is not only assignments')
+
+        var = loop.var.lower()
+        scalar_targets = [s.target.name.lower() for s in loop.body if isinstance(s.target, Name)]
+        if var in scalar_targets:
+            raise NotVectorizable('loop variable is assigned')
+        if len(set(scalar_targets)) != len(scalar_targets):
+            raise NotVectorizable('scalar assigned more than once')
+
+        state = {'var': var, 'sheet': None, 'reads': [], 'rows': False, 'invariant_blocklist': set(scalar_targets)}
+        operations = []
+        writes = []
+        for stmt in loop.body:
+            if isinstance(stmt.target, Name):
+                name = stmt.target.name.lower()
+                term, sign = self.reduction_term(stmt, name)
+                code = self.vector_operand(term, state)
+                if 'series' not in state.pop('last_kind', ()):
+                    raise NotVectorizable('reduction term does not depend on the rows')
+                operations.append(f"{self.name_target(stmt.target.name)} = {self.name_target(stmt.target.name)} {sign} ({code}).sum()")
+                continue
+            ref = cell_ref(stmt.target)
+            if not ref:
+                raise NotVectorizable('target is not a cell')
+            column = self.vector_cell(ref, state)
+            code = self.vector_expr(stmt.value, state)
+            state.pop('last_kind', None)
+            operations.append(f"_block[{column}] = {code}")
+            if column not in writes:
+                writes.append(column)
+
+        sheet = state['sheet'] or 'active_sheet'
+        reads = list(state['reads'])
+        lines = [
+            f"# For {loop.var} = {format_vba(loop.start)} To {format_vba(loop.end)}: vectorized, no loop-carried dependences",
+            f"_first, _last = int({self.expr(loop.start)}), int({self.expr(loop.end)})",
+            f"_block = read_columns({sheet}, _first, _last, {reads})",
+        ]
+        if state['rows']:
+            lines.append('_rows = row_series(_block)')
+        lines.extend(operations)
+        if writes:
+            lines.append(f"write_columns({sheet}, _block, _first, {writes})")
+        lines.append(f"{ident(loop.var)} = max(_first, _last + 1)")
+        self.vectorized_loops.append((self.proc.name, loop.var))
+        return lines
+
+    def reduction_term(self, stmt, name):
+        value = stmt.value
+        if isinstance(value, BinOp) and value.op in ('+', '-') and is_name(value.left, name):
+            term, sign = value.right, value.op
+        elif isinstance(value, BinOp) and value.op == '+' and is_name(value.right, name):
+            term, sign = value.left, '+'
+        else:
+            raise NotVectorizable(f"{name} is not a sum reduction")
+        if any(is_name(node, name) for node in walk_expr(term)):
+            raise NotVectorizable(f"{name} appears in its own reduction term")
+        return term, sign
+
+    def vector_cell(self, ref, state):
+        sheet, row, column = ref
+        if not is_name(row, state['var']):
+            raise NotVectorizable('row index is not the loop variable')
+        if not (isinstance(column, Num) and isinstance(column.value, int)):
+            raise NotVectorizable('column is not a constant')
+        sheet_code = self.sheet_expr(sheet)
+        if state['sheet'] not in (None, sheet_code):
+            raise NotVectorizable('loop touches more than one sheet')
+        state['sheet'] = sheet_code
+        return column.value
+
+    def vector_expr(self, expr, state):
+        kinds = state.setdefault('last_kind', set())
+        ref = cell_ref(expr)
+        if ref:
+            column = self.vector_cell(ref, state)
+            if column not in state['reads']:
+                state['reads'].append(column)
+            kinds.add('series')
+            return f"_block[{column}]"
+        if isinstance(expr, (Num, Str)):
+            return self.expr(expr)
+        if isinstance(expr, Name):
+            name = expr.name.lower()
+            if name == state['var']:
+                state['rows'] = True
+                kinds.add('series')
+                return '_rows'
+            if name in state['invariant_blocklist'] or name in self.procedure_names or name in self.arrays:
+                raise NotVectorizable(f"{expr.name} is not loop invariant")
+            return self.expr(expr)
+        if isinstance(expr, BinOp) and expr.op in VECTOR_OPS:
+            left = self.vector_operand(expr.left, state, expr.right)
+            right = self.vector_operand(expr.right, state, expr.left)
+            return f"({left} {VECTOR_OPS[expr.op]} {right})"
+        if isinstance(expr, UnaryOp) and expr.op == '-':
+            return f"(-{self.vector_operand(expr.operand, state)})"
+        raise NotVectorizable(f"unsupported expression {format_vba(expr)}")
+
+    def vector_operand(self, expr, state, other=None):
+        """Like operand(): a column used in arithmetic/comparisons reads empty cells as 0 (or "")."""
+        code = self.vector_expr(expr, state)
+        if not cell_ref(expr):
+            return code
+        return f"vba_str({code})" if isinstance(other, Str) else f"vba_num({code})"
+
+    # -- references ---------------------------------------------------------
+
+    def is_cell_var(self, expr):
+        """True for `cell.Value` where cell holds a cell/range object."""
+        return (isinstance(expr, Attr) and expr.name.lower() in ('value', 'value2')
+                and isinstance(expr.obj, Name) and expr.obj.name.lower() in self.cell_vars)
+
+    def is_sheet(self, expr):
+        expr = unwrap_with(expr)
+        if isinstance(expr, Call) and len(expr.args) == 1 and is_worksheets(expr.func):
+            return True
+        return is_name(expr, 'activesheet') or (isinstance(expr, Name) and expr.name.lower() not in self.procedure_names and not cell_ref(expr))
+
+    def sheet_expr(self, sheet):
+        if sheet is None:
+            return 'active_sheet'
+        return self.object_ref(sheet)
+
+    def base_sheet(self, expr):
+        """Find the sheet a chain like ws.Columns("A:C") or Cells hangs off."""
+        expr = unwrap_with(expr)
+        while isinstance(expr, (Attr, Call)):
+            if isinstance(expr, Call) and is_worksheets(expr.func):
+                return self.object_ref(expr)
+            expr = unwrap_with(expr.obj if isinstance(expr, Attr) else expr.func)
+        if isinstance(expr, Name) and expr.name.lower() not in ('cells', 'columns', 'rows', 'range', 'usedrange'):
+            return self.object_ref(expr)
+        return 'active_sheet'
+
+    def object_ref(self, expr):
+        """Lower expr as an object (a cell, range or sheet) rather than its value."""
+        return self.expr(expr, as_value=False)
+
+    # -- expressions --------------------------------------------------------
+
+    def expr(self, expr, as_value=True):
+        suffix = '.value' if as_value else ''
+        expr = unwrap_with(expr)
+
+        # Cells(Rows.Count, c).End(xlUp).Row
+        if (isinstance(expr, Attr) and expr.name.lower() == 'row' and isinstance(expr.obj, Call)
+                and isinstance(expr.obj.func, Attr) and expr.obj.func.name.lower() == 'end'):
+            ref = cell_ref(expr.obj.func.obj)
+            if ref:
+                return f"last_row({self.sheet_expr(ref[0])}, {self.expr(ref[2])})"
+
+        ref = cell_ref(expr)
+        if ref:
+            sheet, row, column = ref
+            return f"{self.sheet_expr(sheet)}.cell(row={self.expr(row)}, column={self.expr(column)}){suffix}"
+        ref = range_ref(expr)
+        if ref:
+            sheet, address = ref
+            return f"{self.sheet_expr(sheet)}[{self.expr(address)}]{suffix}"
+
+        if isinstance(expr, Num):
+            return repr(expr.value)
+        if isinstance(expr, Str):
+            return repr(expr.value)
+        if isinstance(expr, Name):
+            if as_value and expr.name.lower() in self.cell_vars:
+                return f"{ident(expr.name)}.value"
+            return self.name_expr(expr.name)
+        if isinstance(expr, Attr):
+            return self.attr_expr(expr)
+        if isinstance(expr, Call):
+            return self.call_expr(expr)
+        if isinstance(expr, BinOp):
+            if expr.op == '&':
+                return f"(vba_str({self.expr(expr.left)}) + vba_str({self.expr(expr.right)}))"
+            if expr.op not in BINARY_OPS:
+                raise Unsupported(f"operator {expr.op}")
+            if expr.op in VECTOR_OPS:
+                # Arithmetic and comparisons: an empty cell reads as 0, or as "" next to a string
+                left = self.operand(expr.left, expr.right)
+                right = self.operand(expr.right, expr.left)
+                return f"({left} {BINARY_OPS[expr.op]} {right})"
+            return f"({self.expr(expr.left)} {BINARY_OPS[expr.op]} {self.expr(expr.right)})"
+        if isinstance(expr, UnaryOp):
+            if expr.op == 'not':
+                return f"(not {self.expr(expr.operand)})"
+            return f"(-{self.operand(expr.operand)})"
+        raise Unsupported(f"expression {format_vba(expr)}")
+
+    def operand(self, expr, other=None):
+        """An arithmetic/comparison operand, with cell values coerced like VBA's Empty."""
+        code = self.expr(expr)
+        target = unwrap_with(expr)
+        if not (cell_ref(target) or range_ref(target) or self.is_cell_var(target)
+                or (isinstance(target, Name) and target.name.lower() in self.cell_vars)):
+            return code
+        return f"vba_str({code})" if isinstance(other, Str) else f"vba_num({code})"
+
+    def name_expr(self, name):
+        lowered = name.lower()
+        if lowered in CONSTANTS:
+            return CONSTANTS[lowered]
+        if self.proc.kind == 'Function' and lowered == self.proc.name.lower():
+            return '_result'
+        if lowered in self.procedure_names:
+            return f"{ident(self.procedure_names[lowered])}(wb)"
+        if lowered.startswith('xl'):
+            raise Unsupported(f"Excel constant {name}")
+        return ident(name)
+
+    def attr_expr(self, expr):
+        obj = unwrap_with(expr.obj)
+        name = expr.name.lower()
+        if is_worksheets(expr) or (name in ('worksheets', 'sheets')):
+            raise Unsupported('worksheet collection')
+        if cell_ref(obj) or range_ref(obj) or (isinstance(obj, Name) and obj.name.lower() in self.cell_vars):
+            if name in CELL_ATTRS:
+                return f"{self.object_ref(obj)}.{CELL_ATTRS[name]}"
+            raise Unsupported(f"cell property {expr.name}")
+        if name == 'name' and self.is_sheet(obj):
+            return f"{self.object_ref(obj)}.title"
+        if name == 'count' and (is_name(obj, 'rows') or (isinstance(obj, Attr) and obj.name.lower() == 'rows')):
+            return f"{self.base_sheet(obj)}.max_row"
+        if name == 'add' and is_worksheets(obj):
+            return 'wb.create_sheet()'
+        if name == 'activesheet':
+            return 'active_sheet'
+        raise Unsupported(f"property {expr.name}")
+
+    def call_expr(self, expr):
+        func = unwrap_with(expr.func)
+        args = [self.expr(a) for a in expr.args]
+        if is_worksheets(func) and len(args) == 1:
+            if isinstance(expr.args[0], Str):
+                return f"wb[{args[0]}]"
+            return f"get_sheet(wb, {args[0]})"
+        if isinstance(func, Name):
+            lowered = func.name.lower()
+            if lowered in self.arrays:
+                return f"{ident(func.name)}[{']['.join(args)}]"
+            if lowered in self.procedure_names:
+                return f"{ident(self.procedure_names[lowered])}({', '.join(['wb'] + args)})"
+            if lowered in FUNCTIONS:
+                return FUNCTIONS[lowered].format(', '.join(args))
+            if lowered == 'msgbox':
+                return f"print({args[0] if args else ''})"
+        if isinstance(func, Attr) and func.name.lower() == 'add' and is_worksheets(func.obj):
+            return 'wb.create_sheet()'
+        raise Unsupported(f"call {format_vba(expr)}")
+
+
+def indent(lines, prefix='    '):
+    return [prefix + line if line else line for line in lines]
+
+
+def translate_module(module_ir, vectorize=True):
+    """Return the Python source for every procedure in module_ir."""
+    return PythonTranslator(module_ir, vectorize).translate()
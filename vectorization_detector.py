@@ -0,0 +1,243 @@
+import logging
+import re
+
+from vba_ir import (
+    Num, Str, Name, Attr, Call, Assign, CallStmt, ForLoop, ForEach, WhileLoop, If,
+    walk_expr, unwrap_with, statement_expressions, cell_ref, range_ref, is_worksheets, strip_value,
+)
+
+logger = logging.getLogger(__name__)
+
+# Relative costs used for the speedup estimate. A COM round trip from VBA into
+# the Excel object model costs far more than an interpreted loop iteration
+# over an in-memory Variant array.
+COM_CALL_COST = 1.0
+LOOP_ITERATION_COST = 0.02
+# Rows assumed for loops whose bounds are only known at run time (lastRow, UsedRange...)
+DEFAULT_ITERATIONS = 1000
+# Procedures expected to speed up less than this are considered efficient
+EFFICIENT_THRESHOLD = 1.5
+
+# Cell properties that Range.Value cannot read or write in bulk
+FORMAT_PROPERTIES = {
+    'interior', 'font', 'borders', 'numberformat', 'horizontalalignment', 'verticalalignment',
+    'wraptext', 'columnwidth', 'rowheight', 'style',
+}
+
+# Range-valued properties whose size is only known at run time
+RANGE_PROPERTIES = {'usedrange', 'currentregion', 'rows', 'columns', 'cells'}
+
+ADDRESS_RE = re.compile(r'^\$?([A-Za-z]+)\$?(\d+)(?::\$?([A-Za-z]+)\$?(\d+))?$')
+
+
+def column_number(letters):
+    number = 0
+    for ch in letters.upper():
+        number = number * 26 + ord(ch) - ord('A') + 1
+    return number
+
+
+def range_size(address):
+    """Number of cells in a literal A1-style address, or None if it is not literal."""
+    match = ADDRESS_RE.match(address.strip())
+    if not match:
+        return None
+    if not match.group(3):
+        return 1
+    rows = abs(int(match.group(4)) - int(match.group(2))) + 1
+    columns = abs(column_number(match.group(3)) - column_number(match.group(1))) + 1
+    return rows * columns
+
+
+def is_range_object(expr):
+    """True for Range(...)/Cells(...) and run-time sized ranges such as ws.UsedRange or r.Cells."""
+    if range_ref(expr) or cell_ref(expr):
+        return True
+    expr = unwrap_with(expr)
+    return isinstance(expr, Attr) and expr.name.lower() in RANGE_PROPERTIES
+
+
+def format_loop(loop):
+    if isinstance(loop, ForLoop):
+        return f"For {loop.var}"
+    if isinstance(loop, ForEach):
+        return f"For Each {loop.var}"
+    return "Do/While loop"
+
+
+class VectorizationDetector:
+    """Deterministic scan of each procedure's loops for bulk Range.Value opportunities.
+
+    Every Cells/Range access, Worksheets(...) lookup and Select/Activate call
+    is a COM round trip. Inside a loop that cost is paid once per iteration;
+    reading the block into a Variant array with one Range.Value call (and
+    writing it back with another) pays it once.
+    """
+
+    def __init__(self, module_ir, default_iterations=DEFAULT_ITERATIONS):
+        self.module = module_ir
+        self.default_iterations = default_iterations
+
+    def analyze(self):
+        """Return one report per procedure, highest expected speedup first."""
+        reports = [self.analyze_procedure(proc) for proc in self.module.procedures]
+        return sorted(reports, key=lambda report: report['speedup_score'], reverse=True)
+
+    def score_macros(self, parsed_macros):
+        """Attach speedup_score, vectorization_findings and efficient to parsed macro dicts.
+
+        parsed_macros must be the list the module IR was built from.
+        """
+        reports = [self.analyze_procedure(proc) for proc in self.module.procedures]
+        for macro, report in zip(parsed_macros, reports):
+            macro['speedup_score'] = report['speedup_score']
+            macro['vectorization_findings'] = report['findings']
+            macro['efficient'] = report['speedup_score'] < EFFICIENT_THRESHOLD
+        return sorted(reports, key=lambda report: report['speedup_score'], reverse=True)
+
+    def analyze_procedure(self, proc):
+        state = {'findings': [], 'iterations': 0}
+        self.scan(proc.body, state, loops=[], multiplier=1)
+
+        calls_before = sum(f['com_calls'] for f in state['findings'])
+        calls_after = sum(f['com_calls_after'] for f in state['findings'])
+        loop_cost = state['iterations'] * LOOP_ITERATION_COST
+        before = calls_before * COM_CALL_COST + loop_cost
+        after = calls_after * COM_CALL_COST + loop_cost
+        speedup = before / after if after else 1.0
+
+        return {
+            'name': proc.name,
+            'findings': state['findings'],
+            'com_calls': calls_before,
+            'com_calls_after': calls_after,
+            'com_calls_avoided': calls_before - calls_after,
+            'speedup_score': round(max(speedup, 1.0), 2),
+        }
+
+    def loop_iterations(self, loop):
+        """Return (iterations, estimated); estimated is True when the count is only known at run time."""
+        if isinstance(loop, ForLoop) and isinstance(loop.start, Num) and isinstance(loop.end, Num):
+            step = loop.step.value if isinstance(loop.step, Num) else 1
+            if step:
+                return max(0, int((loop.end.value - loop.start.value) // step) + 1), False
+        if isinstance(loop, ForEach):
+            ref = range_ref(loop.iterable)
+            if ref and isinstance(ref[1], Str):
+                size = range_size(ref[1].value)
+                if size is not None:
+                    return size, False
+        return self.default_iterations, True
+
+    def scan(self, statements, state, loops, multiplier, counts=None):
+        for stmt in statements:
+            if counts is not None and not isinstance(stmt, WhileLoop):
+                # A nested Do/While counts its own condition on each of its iterations
+                self.count_accesses(stmt, counts)
+            elif isinstance(stmt, CallStmt) and self.is_select(stmt.call):
+                self.add_finding(state, 'select_activate', None, 1, 1, 0,
+                                 f"{self.describe_call(stmt.call)} is not needed to read or write cells")
+
+            if isinstance(stmt, (ForLoop, ForEach, WhileLoop)):
+                self.scan_loop(stmt, state, loops, multiplier)
+            elif isinstance(stmt, If):
+                for _, body in stmt.branches:
+                    self.scan(body, state, loops, multiplier, counts)
+                self.scan(stmt.orelse, state, loops, multiplier, counts)
+
+    def scan_loop(self, loop, state, loops, multiplier):
+        iterations, estimated = self.loop_iterations(loop)
+        total = multiplier * iterations
+        state['iterations'] += total
+        if loops and not isinstance(loop, WhileLoop) and estimated:
+            self.add_finding(state, 'nested_loop', loop, 0, total, 0,
+                             f"{format_loop(loop)} inside {format_loop(loops[0])} walks a run-time sized range cell by cell; "
+                             f"read it once with Range.Value into a 2-D array")
+        if isinstance(loop, ForEach) and is_range_object(loop.iterable):
+            # Each step of For Each over a Range hands back a Range object
+            self.add_finding(state, 'cell_access', loop, 1, total, 1,
+                             f"{format_loop(loop)} fetches one Range object per cell")
+
+        # Loop variables holding a cell: every c.Value / c.Interior... on them is a COM call
+        cell_vars = {outer.var.lower() for outer in loops + [loop]
+                     if isinstance(outer, ForEach) and is_range_object(outer.iterable)}
+        counts = {'reads': 0, 'writes': 0, 'formats': 0, 'lookups': 0, 'selects': [], 'cell_vars': cell_vars}
+        if isinstance(loop, WhileLoop):
+            # Do While Cells(i, 1).Value <> "" reads the cell on every iteration
+            self.count_accesses(loop, counts)
+        self.scan(loop.body, state, loops + [loop], total, counts)
+
+        accesses = counts['reads'] + counts['writes']
+        if accesses:
+            # One bulk read and/or one bulk write replaces every per-cell access
+            bulk_calls = (1 if counts['reads'] else 0) + (1 if counts['writes'] else 0)
+            self.add_finding(state, 'cell_access', loop, accesses, total, bulk_calls,
+                             f"{counts['reads']} Range/Cells read(s) and {counts['writes']} write(s) per iteration of "
+                             f"{format_loop(loop)}; use bulk Range.Value reads/writes of the whole block")
+        if counts['formats']:
+            # Not counted as avoidable: formatting does not go through Range.Value
+            self.add_finding(state, 'cell_format', loop, counts['formats'], total, counts['formats'] * total,
+                             f"{counts['formats']} cell formatting access(es) (Interior, Font, ...) per iteration of "
+                             f"{format_loop(loop)}; Range.Value cannot carry formatting, so format the whole range "
+                             f"in one call or use conditional formatting")
+        if counts['lookups']:
+            self.add_finding(state, 'sheet_lookup', loop, counts['lookups'], total, 1,
+                             f"Worksheets(...) is looked up {counts['lookups']} time(s) per iteration of {format_loop(loop)}; "
+                             f"Set a worksheet variable before the loop")
+        for description in counts['selects']:
+            self.add_finding(state, 'select_activate', loop, 1, total, 0,
+                             f"{description} runs on every iteration of {format_loop(loop)}; "
+                             f"reference the range directly instead")
+
+    def count_accesses(self, stmt, counts):
+        """Add the COM calls a statement makes on each evaluation to counts."""
+        for expr in statement_expressions(stmt):
+            is_target = isinstance(stmt, Assign) and expr is stmt.target
+            # A With block's object is looked up once by the With statement, not per iteration
+            nodes = list(walk_expr(expr, into_with=False))
+            formatted = {id(node.obj) for node in nodes
+                         if isinstance(node, Attr) and node.name.lower() in FORMAT_PROPERTIES}
+            for node in nodes:
+                if self.is_cell_access(node, counts['cell_vars']):
+                    if id(node) in formatted:
+                        counts['formats'] += 1
+                    else:
+                        # Only the outermost reference of an assignment target is a write
+                        counts['writes' if is_target and node is strip_value(expr) else 'reads'] += 1
+                elif isinstance(node, Call) and is_worksheets(node.func):
+                    counts['lookups'] += 1
+        if isinstance(stmt, CallStmt) and self.is_select(stmt.call):
+            counts['selects'].append(self.describe_call(stmt.call))
+
+    def is_cell_access(self, node, cell_vars):
+        if isinstance(node, Call):
+            return bool(cell_ref(node) or range_ref(node))
+        return isinstance(node, Name) and node.name.lower() in cell_vars
+
+    def add_finding(self, state, kind, loop, calls_per_iteration, iterations, calls_after, detail):
+        state['findings'].append({
+            'kind': kind,
+            'loop': format_loop(loop) if loop is not None else None,
+            'calls_per_iteration': calls_per_iteration,
+            'iterations': iterations,
+            'com_calls': calls_per_iteration * iterations,
+            'com_calls_after': min(calls_after, calls_per_iteration * iterations),
+            'detail': detail,
+        })
+
+    def is_select(self, call):
+        return isinstance(call, Call) and isinstance(call.func, Attr) and call.func.name.lower() in ('select', 'activate')
+
+    def describe_call(self, call):
+        return f".{call.func.name}"
+
+
+def format_report(reports):
+    """Plain-text ranking for the analysis PDF."""
+    lines = ["Vectorization Opportunities (ranked by estimated speedup)", ""]
+    for rank, report in enumerate(reports, start=1):
+        lines.append(f"{rank}. {report['name']}: estimated speedup x{report['speedup_score']}, "
+                     f"{report['com_calls_avoided']} of {report['com_calls']} COM calls avoidable")
+        for finding in report['findings']:
+            lines.append(f"   - {finding['detail']}")
+    return "\n".join(lines)